@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for generate_changelog.py.
+
+Builds synthetic git repositories (tags, N commits, periodic large diffs)
+with `git fast-import`, serves a local OpenAI-compatible stand-in and times
+each pipeline stage in-process, then runs the script end to end and reports
+its wall time and peak RSS. Nothing leaves the machine.
+
+Usage:
+    python bench_changelog.py [--commits 1000,10000,100000] [--json results.json]
+
+Repositories are cached under --workdir, so repeated runs only pay for the
+stages being measured.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+import generate_changelog as gc  # noqa: E402
+
+from openai import OpenAI  # noqa: E402
+
+NEW_TAG = "v9.0.0"
+COMMIT_TYPES = ["feat", "fix", "refactor", "perf", "docs", "test", "chore", "build"]
+SCOPES = ["game", "session", "llm", "web", "api", "i18n", "replay", "ci"]
+PACKAGES = [
+    "domain.entity", "domain.vo", "domain.policy", "application.service", "application.usecase",
+    "infrastructure.game", "infrastructure.llm.dao", "infrastructure.repository", "presentation.ktor.api",
+]
+WEB_AREAS = ["app/core", "app/game", "app/game/domain", "app/ui", "app/features", "i18n/en", "i18n/ja"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Synthetic Repository
+# ─────────────────────────────────────────────────────────────────────────────
+
+def synthetic_paths(count: int) -> List[str]:
+    """A file tree shaped like this repo: Kotlin packages, web areas, a second Gradle module."""
+    paths = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 5:
+            pkg = PACKAGES[i % len(PACKAGES)]
+            paths.append(f"src/main/kotlin/io/example/app/internal/{pkg.replace('.', '/')}/Type{i}.kt")
+        elif kind < 7:
+            paths.append(f"src/main/resources/web/{WEB_AREAS[i % len(WEB_AREAS)]}/module{i}.js")
+        elif kind == 7:
+            paths.append(f"src/test/kotlin/io/example/app/internal/{PACKAGES[i % len(PACKAGES)].replace('.', '/')}/Type{i}Test.kt")
+        elif kind == 8:
+            paths.append(f"build-logic/src/main/kotlin/plugin{i}.gradle.kts")
+        else:
+            paths.append(f"docs/guide/page{i}.md")
+    return paths
+
+
+def fast_import_data(out, text: str) -> None:
+    payload = text.encode("utf-8")
+    out.write(b"data %d\n" % len(payload))
+    out.write(payload)
+    out.write(b"\n")
+
+
+def build_repo(
+        path: str,
+        commits: int,
+        files: int,
+        diff_lines: int,
+        large_diff_every: int,
+        tags: int,
+        seed: int,
+) -> None:
+    """
+    Create a repository with `commits` linear commits via git fast-import.
+
+    Tags v0.1.0 .. v0.<tags>.0 sit on the first commits, so a release of NEW_TAG
+    spans (almost) the whole history. Every `large_diff_every`-th commit rewrites
+    a file with 20x the usual number of lines; a few commits repeat "fix typo",
+    and every 250th one is reverted by the next commit.
+    """
+    rng = random.Random(seed)
+    paths = synthetic_paths(files)
+    os.makedirs(path, exist_ok=True)
+    subprocess.run(["git", "init", "-q", "-b", "main", path], check=True)
+
+    proc = subprocess.Popen(
+        ["git", "fast-import", "--quiet"], cwd=path, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    assert proc.stdin is not None and proc.stdout is not None
+    out = proc.stdin
+    prev_subject = ""
+    base_ts = 1_600_000_000
+    for i in range(1, commits + 1):
+        file_path = paths[rng.randrange(len(paths))]
+        lines = diff_lines * (20 if large_diff_every and i % large_diff_every == 0 else 1)
+        if i % 250 == 1 and i > 1:
+            # get-mark answers on stdout with the previous commit's SHA
+            out.write(f"get-mark :{i - 1}\n".encode())
+            out.flush()
+            reverted_sha = proc.stdout.readline().decode().strip()
+            subject = f'Revert "{prev_subject}"'
+            body = f"This reverts commit {reverted_sha}."
+        elif i % 97 == 0:
+            subject, body = "fix typo", ""
+        else:
+            subject = f"{rng.choice(COMMIT_TYPES)}({rng.choice(SCOPES)}): change {i} in {os.path.basename(file_path)}"
+            body = f"Details for change {i}.\n\nRefs #{rng.randrange(1, 5000)}" if i % 3 == 0 else ""
+        prev_subject = subject
+
+        out.write(f"commit refs/heads/main\nmark :{i}\n".encode())
+        out.write(f"committer Bench <bench@example.com> {base_ts + i * 60} +0000\n".encode())
+        fast_import_data(out, subject + ("\n\n" + body if body else ""))
+        if i > 1:
+            out.write(f"from :{i - 1}\n".encode())
+        out.write(f"M 100644 inline {file_path}\n".encode())
+        fast_import_data(out, "".join(f"// {file_path} line {n} rev {i}\n" for n in range(lines)))
+        out.write(b"\n")
+        if i <= tags:
+            out.write(f"tag v0.{i}.0\nfrom :{i}\ntagger Bench <bench@example.com> {base_ts + i * 60} +0000\n".encode())
+            fast_import_data(out, f"Release v0.{i}.0")
+    out.write(b"done\n")
+    out.close()
+    proc.stdout.close()
+    if proc.wait() != 0:
+        raise RuntimeError("git fast-import failed")
+    subprocess.run(["git", "checkout", "-q", "-f", "main"], cwd=path, check=True)
+    subprocess.run(["git", "config", "remote.origin.url", "git@github.com:example/bench.git"], cwd=path, check=True)
+
+
+def ensure_repo(workdir: str, args: argparse.Namespace, commits: int) -> str:
+    """Return a cached synthetic repository for these parameters, building it once."""
+    name = f"repo-{commits}c-{args.files}f-{args.diff_lines}l-{args.large_diff_every}x-{args.tags}t"
+    path = os.path.join(workdir, name)
+    marker = os.path.join(path, ".git", "bench-complete")
+    if os.path.exists(marker):
+        return path
+    shutil.rmtree(path, ignore_errors=True)
+    print(f"Building {name} ...", flush=True)
+    started = time.perf_counter()
+    build_repo(path, commits, args.files, args.diff_lines, args.large_diff_every, args.tags, args.seed)
+    open(marker, "w").close()
+    print(f"  built in {time.perf_counter() - started:.1f}s", flush=True)
+    return path
+
+
+def synthetic_changelog(sections: int) -> str:
+    parts = ["# Changelog\n\nAll notable changes to this project will be documented in this file.\n"]
+    for n in range(sections, 0, -1):
+        parts.append(f"\n## [v1.{n // 10}.{n % 10}] - 2024-01-01\n\n### Added\n")
+        parts.extend(f"- Add feature {n}.{k} to the game lobby (#{n * 10 + k})\n" for k in range(6))
+        parts.append("\n### Fixed\n- Fix reconnect handling in the session actor\n")
+    return "".join(parts)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Stand-in LLM
+# ─────────────────────────────────────────────────────────────────────────────
+
+class StandInLlm:
+    """OpenAI-compatible chat completions endpoint (plain or streamed) with a fixed latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self) -> "StandInLlm":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply(self, messages: List[Dict[str, str]]) -> str:
+        system = messages[0]["content"] if messages else ""
+        user = messages[-1]["content"] if messages else ""
+        if system == gc.MAP_INSTRUCTIONS:
+            shas = re.findall(r"([0-9a-f]{40})\|\|\|[0-9a-f]{7,}", user)
+            return "\n".join(f"{sha}|||Changed|||Summary of {sha[:7]}" for sha in shas)
+        if system == gc.COLLAPSE_INSTRUCTIONS:
+            return "### Changed\n- Merged summary of a block of commits"
+        return f"## [{NEW_TAG}] - 2099-01-01\n\n### Added\n- Benchmark entry\n"
+
+    def _handler(self):
+        llm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+                with llm._lock:
+                    llm.calls += 1
+                time.sleep(llm.latency)
+                content = llm.reply(body.get("messages") or [])
+                model = body.get("model", "bench")
+                if body.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for i in range(0, len(content), 64):
+                        chunk = {
+                            "id": "bench",
+                            "object": "chat.completion.chunk",
+                            "created": 0,
+                            "model": model,
+                            "choices": [{"index": 0, "delta": {"content": content[i:i + 64]}, "finish_reason": None}],
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    return
+                payload = json.dumps({
+                    "id": "bench",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": content},
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Measurement
+# ─────────────────────────────────────────────────────────────────────────────
+
+def measure(fn: Callable, trace_memory: bool):
+    """Run fn() and return (result, seconds, peak Python heap in MiB or None)."""
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        peak = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] / (1 << 20)
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_stages(repo: str, args: argparse.Namespace, llm: StandInLlm, changelog_text: str) -> List[Tuple[str, float, Optional[float], str]]:
+    """Time each stage of the pipeline in-process, in the order main() runs them."""
+    stages = []
+
+    def stage(name: str, fn: Callable, detail: Callable[[object], str] = lambda _: ""):
+        result, elapsed, peak = measure(fn, args.trace_memory)
+        stages.append((name, elapsed, peak, detail(result)))
+        return result
+
+    gc.count_tokens("", args.model)  # load the tokenizer outside the timed stages
+    cwd = os.getcwd()
+    os.chdir(repo)
+    try:
+        def resolve_tags():
+            prev = gc.previous_tag_for(NEW_TAG, gc.get_all_tags(), gc.get_tags_by_creation())
+            end_ref = NEW_TAG if gc.tag_exists(NEW_TAG) else "HEAD"
+            return prev, gc.git_range_or_initial(prev, end_ref), gc.repo_https_url()
+
+        prev_tag, rng, repo_url = stage("tag resolution", resolve_tags, lambda r: f"range {r[1]}")
+        commit_lines, _ = stage(
+            "log collection",
+            lambda: gc.collect_commit_lines(rng, args.max_commit_chars),
+            lambda r: f"{len(r[0])} commits, {sum(len(x) for x in r[0]) // 1024} KiB",
+        )
+        diff_summary = stage(
+            "diff summary", lambda: gc.collect_diff_summary(rng), lambda r: f"{len(r)} chars"
+        )
+        kept, _ = stage(
+            "dedupe", lambda: gc.dedupe_commits(commit_lines), lambda r: f"{len(r[0])} kept, dropped {r[1]}"
+        )
+        churn = stage("commit churn", lambda: gc.commit_churn(rng), lambda r: f"{len(r)} commits")
+
+        with open(os.path.join(SCRIPT_DIR, "changelog_instruct.txt"), "r", encoding="utf-8") as f:
+            instructions = f.read().strip()
+
+        def budget() -> Tuple[str, List[str], int, int]:
+            # The same split as main(): trimmed diff summary, then the commits in what is left
+            trimmed, commit_budget = gc.budget_prompt(
+                instructions, diff_summary, repo_url, prev_tag, NEW_TAG, args.model, args.max_input_tokens
+            )
+            kept_lines, omitted = gc.fit_commits(kept, churn, args.model, commit_budget)
+            return trimmed, kept_lines, omitted, commit_budget
+
+        diff_summary, fitted, _, _ = stage(
+            "token budget",
+            budget,
+            lambda r: f"{len(r[1])} kept, {r[2]} omitted (commit budget {r[3]} tokens)",
+        )
+        user_context = gc.build_user_context(repo_url, prev_tag, NEW_TAG, "\n".join(fitted), diff_summary)
+        client = OpenAI(base_url=llm.base_url, api_key="bench")
+        content = stage(
+            "LLM call",
+            lambda: gc.chat(client, args.model, instructions, user_context, 0.2, 1024),
+            lambda _: f"{len(user_context)} chars in, {args.latency * 1000:.0f} ms stand-in latency",
+        )
+
+        header = content.splitlines()[0].strip()
+        stage(
+            "insert section",
+            lambda: gc.insert_or_replace_section(changelog_text, content + "\n", header),
+            lambda _: f"{len(changelog_text) // 1024} KiB CHANGELOG, new tag",
+        )
+        middle = f"## [v1.{args.changelog_sections // 20}.{args.changelog_sections // 2 % 10}] - 2024-01-01"
+        stage(
+            "replace section",
+            lambda: gc.insert_or_replace_section(changelog_text, middle + "\n\n- Replaced\n", middle),
+            lambda _: "existing tag mid-file",
+        )
+    finally:
+        os.chdir(cwd)
+    return stages
+
+
+def run_end_to_end(repo: str, args: argparse.Namespace, llm: StandInLlm, changelog_text: str, strategy: str) -> Dict:
+    """Run the script as a subprocess; report wall time, peak RSS and LLM calls."""
+    with tempfile.TemporaryDirectory() as tmp:
+        changelog_path = os.path.join(tmp, "CHANGELOG.md")
+        with open(changelog_path, "w", encoding="utf-8") as f:
+            f.write(changelog_text)
+        env = dict(os.environ)
+        env.update({
+            "LLM_API_KEY": "bench",
+            "LLM_BASE_URL": llm.base_url,
+            "LLM_MODEL": args.model,
+            "LLM_MAX_INPUT_TOKENS": str(args.max_input_tokens),
+            "INSTRUCT_PATH": os.path.join(SCRIPT_DIR, "changelog_instruct.txt"),
+            "CHANGELOG_PATH": changelog_path,
+            "CHANGELOG_STRATEGY": strategy,
+            "CHANGELOG_MAX_COMMIT_CHARS": str(args.max_commit_chars),
+        })
+        env.pop("CHANGELOG_SUMMARY_CACHE", None)
+        calls_before = llm.calls
+        # stderr goes to a file: a pipe read only after wait4 deadlocks once the child fills it
+        stderr_path = os.path.join(tmp, "stderr.txt")
+        with open(stderr_path, "wb") as stderr_file:
+            started = time.perf_counter()
+            proc = subprocess.Popen(
+                [sys.executable, os.path.join(SCRIPT_DIR, "generate_changelog.py"), "--new-tag", NEW_TAG],
+                cwd=repo,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr_file,
+            )
+            # wait4 reports this child's own peak RSS (the script; git children are counted separately)
+            _, status, usage = os.wait4(proc.pid, 0)
+            elapsed = time.perf_counter() - started
+        with open(stderr_path, "r", encoding="utf-8", errors="replace") as f:
+            stderr = f.read()
+        exit_code = os.waitstatus_to_exitcode(status)
+        if exit_code != 0:
+            print(f"  end-to-end ({strategy}) failed with exit code {exit_code}:\n{stderr}", file=sys.stderr)
+    return {
+        "strategy": strategy,
+        "seconds": elapsed,
+        "peak_rss_mib": usage.ru_maxrss / 1024,
+        "llm_calls": llm.calls - calls_before,
+        "exit_code": exit_code,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Main
+# ─────────────────────────────────────────────────────────────────────────────
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark generate_changelog.py on synthetic repositories.")
+    parser.add_argument("--commits", default="1000,10000", help="Comma-separated repository sizes")
+    parser.add_argument("--files", type=int, default=500, help="Distinct files touched by the commits")
+    parser.add_argument("--diff-lines", type=int, default=40, help="Lines written per commit")
+    parser.add_argument("--large-diff-every", type=int, default=100, help="Every Nth commit writes 20x the lines")
+    parser.add_argument("--tags", type=int, default=50, help="Release tags placed on the first commits")
+    parser.add_argument("--changelog-sections", type=int, default=2000, help="Sections in the synthetic CHANGELOG")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in LLM latency per call (seconds)")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--max-input-tokens", type=int, default=64_000)
+    parser.add_argument("--max-commit-chars", type=int, default=8_000_000)
+    parser.add_argument("--strategies", default="single,auto", help="End-to-end strategies to run")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also record each stage's peak Python heap (tracemalloc; slows the stages)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "changelog-bench"),
+                        help="Where synthetic repositories are built and cached")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.commits.split(",") if n.strip()]
+    os.makedirs(args.workdir, exist_ok=True)
+    changelog_text = synthetic_changelog(args.changelog_sections)
+    llm = StandInLlm(args.latency).start()
+    results = []
+    try:
+        for commits in sizes:
+            repo = ensure_repo(args.workdir, args, commits)
+            print(f"\n{commits} commits ({repo})")
+            stages = run_stages(repo, args, llm, changelog_text)
+            for name, seconds, peak, detail in stages:
+                mem = f"{peak:8.1f} MiB" if peak is not None else ""
+                print(f"  {name:<16} {seconds * 1000:10.1f} ms {mem}  {detail}")
+            runs = []
+            for strategy in [s.strip() for s in args.strategies.split(",") if s.strip()]:
+                run = run_end_to_end(repo, args, llm, changelog_text, strategy)
+                runs.append(run)
+                print(f"  end-to-end {strategy:<6} {run['seconds'] * 1000:10.1f} ms, "
+                      f"peak RSS {run['peak_rss_mib']:.1f} MiB, {run['llm_calls']} LLM call(s)")
+            results.append({
+                "commits": commits,
+                "stages": [
+                    {"stage": name, "seconds": seconds, "peak_heap_mib": peak, "detail": detail}
+                    for name, seconds, peak, detail in stages
+                ],
+                "end_to_end": runs,
+            })
+    finally:
+        llm.stop()
+
+    print(f"\nBenchmark process peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
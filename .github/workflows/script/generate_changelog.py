@@ -1,14 +1,26 @@
 #!/usr/bin/env python3
 import argparse
 import datetime as dt
+import hashlib
+import heapq
+import json
 import os
 import re
 import subprocess
 import sys
-from typing import List, Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 from openai import OpenAI
 
+try:
+    import tiktoken
+except ImportError:  # optional: without it token counts are estimated from characters
+    tiktoken = None
+
 
 def env(name: str, default: Optional[str] = None) -> Optional[str]:
     """Return env var value, treating empty string as unset."""
@@ -72,7 +84,24 @@ def parse_semver(tag: str) -> Optional[Tuple[int, int, int, str]]:
     )
 
 
-def previous_tag_for(new_tag: str, all_tags: List[str]) -> Optional[str]:
+def get_tags_by_creation() -> List[str]:
+    out = run(
+        [
+            "git",
+            "for-each-ref",
+            "--sort=-creatordate",
+            "--format=%(refname:short)",
+            "refs/tags",
+        ]
+    )
+    return [t for t in out.splitlines() if t]
+
+
+def previous_tag_for(
+        new_tag: str,
+        all_tags: List[str],
+        tags_by_creation: Optional[List[str]] = None,
+) -> Optional[str]:
     """Try to find the previous tag by semver; fallback to creation-date order."""
     parsed_new = parse_semver(new_tag)
     if parsed_new:
@@ -83,21 +112,11 @@ def previous_tag_for(new_tag: str, all_tags: List[str]) -> Optional[str]:
             sv = parse_semver(t)
             if sv:
                 candidates.append((sv, t))
-        lower = [t for (sv, t) in candidates if sv < parsed_new]
+        lower = [(sv, t) for (sv, t) in candidates if sv < parsed_new]
         if lower:
-            lower.sort()
-            return lower[-1]
+            return max(lower)[1]
 
-    out = run(
-        [
-            "git",
-            "for-each-ref",
-            "--sort=-creatordate",
-            "--format=%(refname:short)",
-            "refs/tags",
-        ]
-    )
-    ordered = [t for t in out.splitlines() if t]
+    ordered = tags_by_creation if tags_by_creation is not None else get_tags_by_creation()
     if new_tag in ordered:
         idx = ordered.index(new_tag)
         if idx + 1 < len(ordered):
@@ -134,50 +153,241 @@ def git_range_or_initial(prev_tag: Optional[str], end_ref: str) -> str:
     return f"{first}..{end_ref}"
 
 
-def collect_commits(git_range: str, limit_chars: int = 120_000) -> str:
+def iter_records(cmd: List[str], separator: str, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Stream a command's stdout and yield it record by record (split on `separator`).
+
+    Closing the generator early (e.g. once a budget is used up) stops the process,
+    so callers only pay for the output they consume. A non-zero exit status is
+    raised as CalledProcessError only when the output was read to the end.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    assert proc.stdout is not None
+    finished = False
+    try:
+        pending = ""
+        while True:
+            chunk = proc.stdout.read(chunk_size)
+            if not chunk:
+                break
+            pending += chunk
+            *records, pending = pending.split(separator)
+            yield from records
+        if pending:
+            yield pending
+        finished = True
+    finally:
+        if not finished and proc.poll() is None:
+            proc.terminate()
+        proc.stdout.close()
+        stderr = proc.stderr.read() if finished and proc.stderr else ""
+        if proc.stderr:
+            proc.stderr.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+
+
+COMMITS_LIMIT_CHARS = 120_000
+
+
+def collect_commit_lines(git_range: str, limit_chars: int = COMMITS_LIMIT_CHARS) -> Tuple[List[str], bool]:
     """
-    Collect commit subjects and bodies in a compact, parseable way.
+    Collect one compact, parseable line per commit (subject and body included).
     Uses ASCII record/field separators to avoid accidental delimiter collisions.
+
+    The log is streamed and git is stopped as soon as the budget is used up, so
+    memory and runtime follow `limit_chars` rather than the size of the range.
+    Returns (lines, truncated).
     """
     # RS=0x1e, FS=0x1f
     fmt = "%H%x1f%h%x1f%an%x1f%ad%x1f%s%x1f%b%x1e"
-    log = run(["git", "log", "--date=short", f"--pretty=format:{fmt}", git_range])
+    cmd = ["git", "log", "--date=short", f"--pretty=format:{fmt}", git_range]
 
-    records = log.split("\x1e")
     out_lines: List[str] = []
     total = 0
 
-    for rec in records:
-        rec = rec.strip()
-        if not rec:
-            continue
-        if total + len(rec) > limit_chars:
-            out_lines.append("\n[... truncated commit list ...]\n")
-            break
-        fields = rec.split("\x1f")
-        # Keep raw but predictable; the instruct file can teach the model how to interpret.
-        out_lines.append("|||".join(f.strip() for f in fields))
-        total += len(rec)
+    with closing(iter_records(cmd, "\x1e")) as records:
+        for rec in records:
+            rec = rec.strip()
+            if not rec:
+                continue
+            if total + len(rec) > limit_chars:
+                return out_lines, True
+            fields = rec.split("\x1f")
+            # Keep raw but predictable; the instruct file can teach the model how to interpret.
+            out_lines.append("|||".join(f.strip() for f in fields))
+            total += len(rec)
+
+    return out_lines, False
+
+
+def collect_commits(git_range: str, limit_chars: int = COMMITS_LIMIT_CHARS) -> str:
+    lines, truncated = collect_commit_lines(git_range, limit_chars)
+    if truncated:
+        lines.append("\n[... truncated commit list ...]\n")
+    return "\n".join(lines)
+
+
+DIFF_TOP_AREAS = 40
+DIFF_TOP_FILES = 3
+DIFF_LISTED_REMOVALS = 50
 
-    return "\n".join(out_lines)
+
+def change_area(path: str) -> Tuple[str, str, str]:
+    """
+    Classify a path as (gradle module, kind, name) for the diff summary.
+
+    Kotlin/Java sources group by package, web resources by frontend area
+    (e.g. web/app/game), other resources by their top directory and anything
+    outside a source set by its top one or two directories.
+    """
+    parts = path.split("/")
+    if "src" in parts[:-1]:
+        i = parts.index("src")
+        module = ":" + ":".join(parts[:i])
+        rest = parts[i + 1:]
+        source_set = rest[0] if len(rest) > 1 else ""
+        if len(rest) >= 3 and rest[1] in ("kotlin", "java"):
+            kind = "Kotlin" if source_set == "main" else f"Kotlin ({source_set})"
+            return module, kind, ".".join(rest[2:-1]) or "(default package)"
+        if len(rest) >= 3 and rest[1] == "resources":
+            dirs = rest[2:-1]
+            if dirs and dirs[0] == "web":
+                return module, "Frontend", "/".join(dirs[:3])
+            return module, f"Resources ({source_set})", dirs[0] if dirs else "(top level)"
+        return module, "Sources", "/".join(rest[:-1]) or "(top level)"
+    if len(parts) == 1:
+        return ":", "Files", "(repository root)"
+    return ":", "Files", "/".join(parts[:min(2, len(parts) - 1)])
+
+
+def iter_numstat(git_range: str) -> Iterator[Tuple[str, str, Optional[str], Optional[int], Optional[int]]]:
+    """
+    Stream `git diff --raw --numstat -z` and yield (status, path, old_path, added, deleted).
+
+    Git prints every raw record (which carries the A/M/D/R status) before the
+    numstat records, so statuses are remembered by path until the numstat
+    half arrives. Binary files have added/deleted = None.
+    """
+    cmd = ["git", "diff", "--raw", "--numstat", "-z", "-M", git_range]
+    statuses: Dict[str, str] = {}
+    with closing(iter_records(cmd, "\0")) as records:
+        for rec in records:
+            if not rec:
+                continue
+            if rec.startswith(":"):
+                status = rec.split()[-1][:1]
+                path = next(records)
+                if status in ("R", "C"):
+                    path = next(records)
+                statuses[path] = status
+                continue
+            added, deleted, path = rec.split("\t", 2)
+            old_path = None
+            if not path:  # rename/copy: the two paths follow as separate records
+                old_path = next(records)
+                path = next(records)
+            yield (
+                statuses.pop(path, "M"),
+                path,
+                old_path,
+                None if added == "-" else int(added),
+                None if deleted == "-" else int(deleted),
+            )
 
 
 def collect_diff_summary(git_range: str, limit_chars: int = 80_000) -> str:
+    """
+    Summarize the diff in one streamed pass, ranked by lines changed per area
+    (Gradle module + Kotlin package, frontend area or directory).
+    """
+    areas: Dict[Tuple[str, str, str], Dict] = {}
+    removals: List[str] = []
+    totals = {"files": 0, "added": 0, "deleted": 0}
+    status_totals: Dict[str, int] = {}
+
     try:
-        name_status = run(["git", "diff", "--name-status", git_range])
-    except subprocess.CalledProcessError:
-        name_status = ""
-    try:
-        shortstat = run(["git", "diff", "--shortstat", git_range])
+        for status, path, old_path, added, deleted in iter_numstat(git_range):
+            lines = (added or 0) + (deleted or 0)
+            area = areas.get(change_area(path))
+            if area is None:
+                area = areas[change_area(path)] = {
+                    "files": 0, "added": 0, "deleted": 0, "statuses": {}, "top": []
+                }
+            area["files"] += 1
+            area["added"] += added or 0
+            area["deleted"] += deleted or 0
+            area["statuses"][status] = area["statuses"].get(status, 0) + 1
+            # Paths are unique within a diff, so ties never fall through to the (maybe None) stats
+            entry = (lines, path, added, deleted)
+            if len(area["top"]) < DIFF_TOP_FILES:
+                heapq.heappush(area["top"], entry)
+            else:
+                heapq.heappushpop(area["top"], entry)
+
+            totals["files"] += 1
+            totals["added"] += added or 0
+            totals["deleted"] += deleted or 0
+            status_totals[status] = status_totals.get(status, 0) + 1
+            if status in ("D", "R") and len(removals) < DIFF_LISTED_REMOVALS:
+                removals.append(f"{status} {old_path} -> {path}" if old_path else f"{status} {path}")
     except subprocess.CalledProcessError:
-        shortstat = ""
+        return "(diff summary unavailable)\n"
 
-    diff = f"""# File changes (git diff --name-status {git_range})
-{name_status}
+    def status_counts(counts: Dict[str, int]) -> str:
+        return ", ".join(f"{k} {counts[k]}" for k in "AMDRCT" if counts.get(k))
 
-# Summary (git diff --shortstat {git_range})
-{shortstat}
-"""
+    def file_stat(path: str, added: Optional[int], deleted: Optional[int]) -> str:
+        name = path.rsplit("/", 1)[-1]
+        return f"{name} (+{added}/-{deleted})" if added is not None else f"{name} (binary)"
+
+    # Kotlin packages share a long base package; print it once instead of on every line
+    packages = [
+        name.split(".") for (_, kind, name) in areas
+        if kind.startswith("Kotlin") and not name.startswith("(")
+    ]
+    base = ".".join(os.path.commonprefix(packages)) if len(packages) > 1 else ""
+
+    ranked = sorted(areas.items(), key=lambda kv: kv[1]["added"] + kv[1]["deleted"], reverse=True)
+    lines = [
+        f"# Change summary (git diff --numstat {git_range})",
+        f"{totals['files']} files changed, +{totals['added']}/-{totals['deleted']} "
+        f"({status_counts(status_totals)})",
+    ]
+    if base:
+        lines.append(f"Kotlin packages are relative to {base}")
+    lines += ["", "# Areas ranked by lines changed"]
+    for (module, kind, name), area in ranked[:DIFF_TOP_AREAS]:
+        if base and kind.startswith("Kotlin") and (name + ".").startswith(base + "."):
+            name = name[len(base) + 1:] or "(base package)"
+        prefix = "" if module == ":" else f"[{module}] "
+        top = ", ".join(file_stat(path, a, d) for _, path, a, d in sorted(area["top"], reverse=True))
+        lines.append(
+            f"{prefix}{kind} {name}: {area['files']} files ({status_counts(area['statuses'])}), "
+            f"+{area['added']}/-{area['deleted']}; largest: {top}"
+        )
+    rest = ranked[DIFF_TOP_AREAS:]
+    if rest:
+        lines.append(
+            f"[... {len(rest)} more areas: {sum(a['files'] for _, a in rest)} files, "
+            f"+{sum(a['added'] for _, a in rest)}/-{sum(a['deleted'] for _, a in rest)} ...]"
+        )
+    if removals:
+        lines += ["", "# Removed or renamed files"]
+        lines += removals
+        removed = status_totals.get("D", 0) + status_totals.get("R", 0)
+        if removed > len(removals):
+            lines.append(f"[... {removed - len(removals)} more ...]")
+
+    diff = "\n".join(lines)
     if len(diff) > limit_chars:
         diff = diff[:limit_chars] + "\n[... diff summary truncated ...]\n"
     return diff.strip() + "\n"
@@ -230,6 +440,7 @@ def build_user_context(
         new_tag: str,
         commits: str,
         diff_summary: str,
+        commits_label: str = "COMMITS",
 ) -> str:
     today = dt.date.today().isoformat()
     compare_url = None
@@ -249,9 +460,9 @@ def build_user_context(
 
     body = f"""{os.linesep.join(header)}
 
-=== COMMITS BEGIN ===
+=== {commits_label} BEGIN ===
 {commits}
-=== COMMITS END ===
+=== {commits_label} END ===
 
 === DIFF SUMMARY BEGIN ===
 {diff_summary}
@@ -260,6 +471,596 @@ def build_user_context(
     return body.strip()
 
 
+CHARS_PER_TOKEN = 4  # rough estimate, good enough for chunk budgets
+LLM_TIMEOUT = 300.0  # seconds for one whole (streamed) completion
+LLM_IDLE_TIMEOUT = 60.0  # seconds without a new chunk before a call is abandoned
+LLM_DEADLINE = 1500.0  # seconds for all LLM work of one run, then the deterministic fallback
+MAP_MAX_TOKENS = 4096
+MAP_MAX_COMMITS = 100  # keeps one-line-per-commit answers well under MAP_MAX_TOKENS
+
+MAP_INSTRUCTIONS = """You condense one slice of a git commit log into notes for a release changelog.
+Each input record is one commit: full SHA|||short SHA|||author|||date|||subject|||body.
+Output exactly one line per commit, in input order, formatted as:
+<full SHA>|||<category>|||<one-line summary>
+where <category> is one of Added, Changed, Fixed, Deprecated, Removed, Security, Documentation,
+Internal. Keep PR/issue references (#123), prefix breaking changes with "BREAKING:", and do not
+invent changes. Output nothing else."""
+
+COLLAPSE_INSTRUCTIONS = """You merge release-note material (per-commit notes or bullet sets) into one set.
+Group bullets under ### Added, ### Changed, ### Fixed, ### Deprecated, ### Removed,
+### Security, ### Documentation, ### Internal; merge duplicates, keep references and
+"BREAKING:" markers, and do not drop user-facing changes. Output only headings and bullets."""
+
+REDUCE_NOTE = """
+The commit log was condensed into notes (shown between the COMMIT NOTES markers): one line per
+commit as "<short SHA> [<category>] <summary>", or already merged bullets for very large ranges.
+Treat those notes as the commit log."""
+
+NOTE_CATEGORY_RE = re.compile(r"^\[([A-Za-z]+)\] (.*)$")
+NOTE_LINE_RE = re.compile(r"^\s*([0-9a-f]{7,40})\s*\|\|\|\s*([A-Za-z]+)\s*\|\|\|\s*(.*?)\s*$")
+
+SUMMARY_CACHE_VERSION = 1
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def chunk_by_tokens(items: List[str], max_tokens: int, max_items: Optional[int] = None) -> List[List[str]]:
+    """Greedily pack items, in order, into chunks of at most max_tokens (one item minimum)."""
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for item in items:
+        item_tokens = estimate_tokens(item) + 1
+        full = max_items is not None and len(current) >= max_items
+        if current and (full or current_tokens + item_tokens > max_tokens):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += item_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+MERGE_SUBJECT_RE = re.compile(r"^Merge (pull request|branch|remote-tracking branch|tag|commit)\b")
+REVERTED_SHA_RE = re.compile(r"This reverts commit ([0-9a-f]{7,40})")
+CONVENTIONAL_PREFIX_RE = re.compile(r"^[a-z]+(\([^)]*\))?!?:\s*")
+SHORTSTAT_RE = re.compile(r"(\d+) (insertion|deletion)")
+
+_encoders: Dict[str, object] = {}
+
+
+def get_encoder(model: str):
+    """tiktoken encoding for `model` (o200k_base if unknown), or None when unavailable."""
+    if model not in _encoders:
+        encoder = None
+        if tiktoken is not None:
+            try:
+                try:
+                    encoder = tiktoken.encoding_for_model(model.rsplit("/", 1)[-1])
+                except KeyError:
+                    encoder = tiktoken.get_encoding("o200k_base")
+            except Exception as e:  # encodings are downloaded on first use
+                print(f"WARNING: tiktoken encoding unavailable ({type(e).__name__}); estimating tokens.",
+                      file=sys.stderr)
+        _encoders[model] = encoder
+    return _encoders[model]
+
+
+def count_tokens(text: str, model: str) -> int:
+    encoder = get_encoder(model)
+    if encoder is None:
+        return estimate_tokens(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def normalize_subject(subject: str) -> str:
+    """
+    Subject key for near-duplicate detection: no type prefix, #refs, case or punctuation.
+    The scope stays part of the key, so the same fix in two components is not folded.
+    """
+    text = CONVENTIONAL_PREFIX_RE.sub(lambda m: m.group(1) or "", subject.strip().lower())
+    text = re.sub(r"[^a-z0-9]+", " ", re.sub(r"#\d+", " ", text))
+    return " ".join(text.split())
+
+
+def dedupe_commits(commit_lines: List[str]) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Drop merge commits and revert pairs whose original is in range, and fold
+    commits with near-identical subjects into the newest one ("[+N similar]").
+    Returns (kept lines in log order, counts of what was dropped).
+    """
+    records = [line.split("|||") for line in commit_lines]
+    shas = {fields[0] for fields in records}
+    by_prefix = {sha[:7]: sha for sha in shas}
+
+    reverted = set()
+    for fields in records:
+        body = fields[5] if len(fields) > 5 else ""
+        subject = fields[4] if len(fields) > 4 else ""
+        m = REVERTED_SHA_RE.search(body)
+        if not m or not subject.startswith("Revert"):
+            continue
+        target = by_prefix.get(m.group(1)[:7])
+        if target and target.startswith(m.group(1)) and target not in reverted and fields[0] not in reverted:
+            reverted.update((target, fields[0]))
+
+    report = {"merges": 0, "reverted": len(reverted), "similar": 0}
+    kept: List[List[str]] = []
+    similar: Dict[str, List] = {}  # subject key -> [kept fields, count]
+    for fields in records:
+        subject = fields[4] if len(fields) > 4 else ""
+        if fields[0] in reverted:
+            continue
+        if MERGE_SUBJECT_RE.match(subject):
+            report["merges"] += 1
+            continue
+        key = normalize_subject(subject)
+        if key and key in similar:
+            similar[key][1] += 1
+            report["similar"] += 1
+            continue
+        kept.append(fields)
+        if key:
+            similar[key] = [fields, 1]
+
+    for fields, count in similar.values():
+        if count > 1:
+            fields[4] = f"{fields[4]} [+{count - 1} similar]"
+    return ["|||".join(fields) for fields in kept], report
+
+
+def commit_churn(git_range: str) -> Dict[str, int]:
+    """Lines changed (insertions + deletions) per commit SHA, from one streamed git log."""
+    cmd = ["git", "log", "--no-merges", "--shortstat", "--format=%x1e%H", git_range]
+    churn: Dict[str, int] = {}
+    try:
+        with closing(iter_records(cmd, "\x1e")) as records:
+            for rec in records:
+                sha, _, stat = rec.strip().partition("\n")
+                if sha:
+                    churn[sha] = sum(int(n) for n, _ in SHORTSTAT_RE.findall(stat))
+    except subprocess.CalledProcessError:
+        pass
+    return churn
+
+
+def fit_commits(
+        commit_lines: List[str],
+        churn: Dict[str, int],
+        model: str,
+        budget_tokens: int,
+) -> Tuple[List[str], int]:
+    """
+    Keep the commits with the largest diffs (newest first on ties) until the
+    token budget is used up; kept lines stay in log order. Returns (kept, dropped).
+    """
+    costs = [count_tokens(line, model) + 1 for line in commit_lines]
+    if sum(costs) <= budget_tokens:
+        return commit_lines, 0
+    order = sorted(range(len(commit_lines)), key=lambda i: (-churn.get(commit_lines[i].split("|||", 1)[0], 0), i))
+    chosen = set()
+    used = 0
+    for i in order:
+        if used + costs[i] <= budget_tokens:
+            chosen.add(i)
+            used += costs[i]
+    kept = [line for i, line in enumerate(commit_lines) if i in chosen]
+    return kept, len(commit_lines) - len(kept)
+
+
+def trim_to_tokens(text: str, model: str, max_tokens: int, marker: str) -> str:
+    """Cut `text` at a line boundary so it fits `max_tokens`."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    kept: List[str] = []
+    used = count_tokens(marker, model)
+    for line in text.splitlines():
+        cost = count_tokens(line, model) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept) + "\n" + marker + "\n"
+
+
+def budget_prompt(
+        system: str,
+        diff_summary: str,
+        repo_url: Optional[str],
+        prev_tag: Optional[str],
+        new_tag: str,
+        model: str,
+        max_input_tokens: int,
+) -> Tuple[str, int]:
+    """
+    Split the prompt budget: the diff summary gets at most a quarter of it, the
+    commits what is left after the instructions and the rest of the context.
+    Returns (trimmed diff summary, commit budget in tokens).
+    """
+    diff_summary = trim_to_tokens(diff_summary, model, max_input_tokens // 4, "[... diff summary truncated ...]")
+    overhead = count_tokens(
+        system + REDUCE_NOTE + build_user_context(repo_url, prev_tag, new_tag, "", diff_summary), model
+    )
+    return diff_summary, max(1_000, max_input_tokens - overhead)
+
+
+def stream_chat(
+        client: OpenAI,
+        model: str,
+        system: str,
+        user: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+) -> Tuple[str, float, float]:
+    """
+    Stream one completion and return (text, seconds to first token, total seconds).
+
+    The client's own timeout bounds every wait for the next chunk (idle timeout);
+    `timeout` bounds the whole call, so a provider that trickles tokens cannot
+    hold the job either. Raises TimeoutError when the deadline passes.
+
+    SSE keepalive comments count as reads for the idle timeout but never yield a
+    chunk, so the deadline is enforced by a watchdog that closes the response
+    under the reader rather than by checks between chunks.
+    """
+    started = time.monotonic()
+    expired = threading.Event()
+    streams: list = []
+
+    def expire() -> None:
+        expired.set()
+        for open_stream in streams:
+            open_stream.close()
+
+    watchdog = threading.Timer(timeout, expire)
+    watchdog.daemon = True
+    watchdog.start()
+    parts: List[str] = []
+    first_token = 0.0
+    try:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            temperature=temperature,
+            top_p=0.9,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        streams.append(stream)
+        try:
+            for chunk in stream:
+                if expired.is_set():
+                    break
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content if chunk.choices[0].delta else None
+                if delta:
+                    if not parts:
+                        first_token = time.monotonic() - started
+                    parts.append(delta)
+                if chunk.choices[0].finish_reason == "length":
+                    print(f"WARNING: {model} stopped at max_tokens={max_tokens}; output may be cut short.",
+                          file=sys.stderr)
+        finally:
+            stream.close()
+    except Exception as e:
+        if expired.is_set():
+            raise TimeoutError(f"{model} did not finish within {timeout:.0f}s") from e
+        raise
+    finally:
+        watchdog.cancel()
+    if expired.is_set():
+        raise TimeoutError(f"{model} did not finish within {timeout:.0f}s")
+    return "".join(parts), first_token, time.monotonic() - started
+
+
+def chat(
+        client: OpenAI,
+        model: str,
+        system: str,
+        user: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float = LLM_TIMEOUT,
+) -> str:
+    text, _, _ = stream_chat(client, model, system, user, temperature, max_tokens, timeout)
+    return text.strip()
+
+
+def call_timeout(timeout: float, deadline: Optional[float]) -> float:
+    """
+    `timeout` capped by the script-wide `deadline` (a time.monotonic() value).
+    Raises TimeoutError once the deadline has passed.
+    """
+    if deadline is None:
+        return timeout
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("changelog deadline reached")
+    return min(timeout, left)
+
+
+def summarize_parallel(
+        client: OpenAI,
+        model: str,
+        system: str,
+        inputs: List[str],
+        temperature: float,
+        parallel: int,
+        timeout: float = LLM_TIMEOUT,
+        deadline: Optional[float] = None,
+        on_result: Optional[Callable[[int, str], None]] = None,
+) -> List[str]:
+    """
+    Run one chat call per input with at most `parallel` in flight; results keep input order.
+
+    `on_result(index, text)` sees each answer as it arrives. The first failure
+    cancels the calls that have not started yet and is re-raised.
+    """
+    def run_one(text: str) -> str:
+        return chat(client, model, system, text, temperature, MAP_MAX_TOKENS, call_timeout(timeout, deadline))
+
+    results = [""] * len(inputs)
+    pool = ThreadPoolExecutor(max_workers=max(1, parallel))
+    try:
+        futures = {pool.submit(run_one, text): i for i, text in enumerate(inputs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_result is not None:
+                on_result(i, results[i])
+    except BaseException:
+        # Running calls are still joined at exit, but each ends by its deadline-capped watchdog
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return results
+
+
+def load_summary_cache(path: Optional[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Load the per-commit summary cache: {"commits": {sha: note}, "sections": {key: text}}.
+    A missing, unreadable or outdated file yields an empty cache.
+    """
+    empty: Dict[str, Dict[str, str]] = {"commits": {}, "sections": {}}
+    if not path or not os.path.exists(path):
+        return empty
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"WARNING: ignoring unreadable summary cache {path}: {e}", file=sys.stderr)
+        return empty
+    if not isinstance(data, dict) or data.get("version") != SUMMARY_CACHE_VERSION:
+        return empty
+    return {
+        "commits": dict(data.get("commits") or {}),
+        "sections": dict(data.get("sections") or {}),
+    }
+
+
+def save_summary_cache(path: Optional[str], cache: Dict[str, Dict[str, str]]) -> None:
+    """Write the cache atomically (temp file + rename) so an aborted run cannot corrupt it."""
+    if not path:
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": SUMMARY_CACHE_VERSION, "commits": cache["commits"], "sections": cache["sections"]},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            sort_keys=True,
+        )
+    os.replace(tmp_path, path)
+
+
+def section_cache_key(model: str, system: str, user: str) -> str:
+    return hashlib.sha256("\x00".join([model, system, user]).encode("utf-8")).hexdigest()
+
+
+def summarize_commits(
+        client: OpenAI,
+        model: str,
+        commit_lines: List[str],
+        chunk_tokens: int,
+        temperature: float,
+        parallel: int,
+        cached: Dict[str, str],
+        timeout: float = LLM_TIMEOUT,
+        deadline: Optional[float] = None,
+) -> List[str]:
+    """
+    Map step: condense each commit to one "<short SHA> [<category>] <summary>" line.
+
+    Commits whose full SHA is already in `cached` are not sent again; the rest go
+    out in token-bounded chunks, concurrently, and their notes are added to `cached`
+    as each chunk finishes, so a failed run still keeps the chunks that made it.
+    A commit the model skipped falls back to its subject (and is not cached).
+    """
+    pending = [line for line in commit_lines if line.split("|||", 1)[0] not in cached]
+    print(f"Commit notes: {len(commit_lines) - len(pending)} cached, {len(pending)} to summarize.")
+
+    if pending:
+        chunks = chunk_by_tokens(pending, chunk_tokens, MAP_MAX_COMMITS)
+        inputs = [
+            f"Commits (slice {i} of {len(chunks)}):\n" + "\x1e\n".join(chunk)
+            for i, chunk in enumerate(chunks, 1)
+        ]
+        print(f"Map-reduce: summarizing {len(pending)} commits in {len(chunks)} chunk(s) "
+              f"(parallel={parallel}).")
+
+        def store(index: int, output: str) -> None:
+            shas = [line.split("|||", 1)[0] for line in chunks[index]]
+            for out_line in output.splitlines():
+                m = NOTE_LINE_RE.match(out_line)
+                if not m:
+                    continue
+                sha = next((s for s in shas if s.startswith(m.group(1))), None)
+                if sha and m.group(3):
+                    cached[sha] = f"[{m.group(2).capitalize()}] {m.group(3)}"
+
+        summarize_parallel(
+            client, model, MAP_INSTRUCTIONS, inputs, temperature, parallel, timeout, deadline, store
+        )
+
+    notes: List[str] = []
+    for line in commit_lines:
+        fields = line.split("|||")
+        sha = fields[0]
+        short = fields[1] if len(fields) > 1 else sha[:7]
+        subject = fields[4] if len(fields) > 4 else ""
+        notes.append(f"{short} {cached.get(sha) or subject}")
+    return notes
+
+
+def collapse_notes(
+        client: OpenAI,
+        model: str,
+        notes: List[str],
+        chunk_tokens: int,
+        temperature: float,
+        parallel: int,
+        cached: Dict[str, str],
+        used: Dict[str, str],
+        timeout: float = LLM_TIMEOUT,
+        deadline: Optional[float] = None,
+) -> str:
+    """
+    Merge note lines (in parallel, level by level) until they fit in one chunk.
+
+    Notes are newest first, so blocks are packed from the oldest end: a new release
+    only changes the newest blocks, and the others are reused from `cached`. Every
+    block merged in this run is recorded in `used`.
+    """
+    while len(notes) > 1 and estimate_tokens("\n".join(notes)) > chunk_tokens:
+        groups = [group[::-1] for group in chunk_by_tokens(notes[::-1], chunk_tokens)][::-1]
+        if len(groups) == len(notes):
+            # Every note fills a chunk on its own: merge pairwise to make progress
+            groups = [notes[i:i + 2] for i in range(0, len(notes), 2)]
+        inputs = ["\n\n".join(group) for group in groups]
+        keys = [section_cache_key(model, COLLAPSE_INSTRUCTIONS, text) for text in inputs]
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        print(f"Map-reduce: merging {len(notes)} note block(s) into {len(groups)} "
+              f"({len(groups) - len(missing)} cached).")
+
+        def store(index: int, output: str) -> None:
+            cached[keys[missing[index]]] = output
+
+        summarize_parallel(
+            client, model, COLLAPSE_INSTRUCTIONS, [inputs[i] for i in missing], temperature, parallel,
+            timeout, deadline, store,
+        )
+        notes = [cached[key] for key in keys]
+        used.update((key, cached[key]) for key in keys)
+    return "\n".join(notes)
+
+
+CATEGORY_ORDER = ["Added", "Changed", "Fixed", "Deprecated", "Removed", "Security", "Documentation", "Internal"]
+CATEGORY_BY_TYPE = {
+    "feat": "Added",
+    "fix": "Fixed",
+    "perf": "Changed",
+    "refactor": "Changed",
+    "style": "Internal",
+    "docs": "Documentation",
+    "security": "Security",
+    "deprecate": "Deprecated",
+    "remove": "Removed",
+    "revert": "Removed",
+    "test": "Internal",
+    "chore": "Internal",
+    "build": "Internal",
+    "ci": "Internal",
+}
+CONVENTIONAL_TYPE_RE = re.compile(r"^(?P<type>[a-zA-Z]+)(\([^)]*\))?(?P<bang>!)?:\s*(?P<text>.+)$")
+FALLBACK_MAX_BULLETS = 40
+
+
+def deterministic_section(new_tag: str, commit_lines: List[str], notes: Dict[str, str]) -> str:
+    """
+    Changelog section built without an LLM: commits grouped by their cached
+    note category or Conventional Commits type, breaking changes first.
+    """
+    breaking: List[str] = []
+    grouped: Dict[str, List[str]] = {category: [] for category in CATEGORY_ORDER}
+    for line in commit_lines:
+        fields = line.split("|||")
+        if len(fields) < 5:
+            continue
+        sha, short, subject = fields[0], fields[1], fields[4]
+        body = fields[5] if len(fields) > 5 else ""
+        note = NOTE_CATEGORY_RE.match(notes.get(sha, ""))
+        m = CONVENTIONAL_TYPE_RE.match(subject)
+        if note and note.group(1) in grouped:
+            category, text = note.group(1), note.group(2)
+        elif m:
+            category = CATEGORY_BY_TYPE.get(m.group("type").lower(), "Changed")
+            text = m.group("text")
+        else:
+            category, text = "Changed", subject
+        bullet = f"- {text[:1].upper()}{text[1:]} ({short})"
+        if (m and m.group("bang")) or "BREAKING CHANGE" in body or text.startswith("BREAKING"):
+            breaking.append(bullet)
+        else:
+            grouped[category].append(bullet)
+
+    def block(title: str, bullets: List[str]) -> List[str]:
+        shown = bullets[:FALLBACK_MAX_BULLETS]
+        if len(bullets) > len(shown):
+            shown.append(f"- ...and {len(bullets) - len(shown)} more")
+        return [f"### {title}", *shown, ""]
+
+    lines = [f"## [{new_tag}] - {dt.date.today().isoformat()}", ""]
+    if breaking:
+        lines += block("⚠️ Breaking changes", breaking)
+    for category in CATEGORY_ORDER:
+        if grouped[category]:
+            lines += block(category, grouped[category])
+    if not breaking and not any(grouped.values()):
+        lines += block("Internal", ["- No notable changes"])
+    return "\n".join(lines).strip()
+
+
+def generate_section(
+        client: OpenAI,
+        models: List[str],
+        system: str,
+        user: str,
+        temperature: float,
+        max_tokens: int,
+        timeout: float,
+        deadline: Optional[float] = None,
+) -> Tuple[str, str]:
+    """
+    Try each model in turn (primary, then fallback) until `deadline` passes.
+    Returns (text, model that produced it), or ("", "") if all of them fail.
+    """
+    for model in models:
+        try:
+            text, first_token, total = stream_chat(
+                client, model, system, user, temperature, max_tokens, call_timeout(timeout, deadline)
+            )
+        except Exception as e:  # timeouts, provider and transport errors alike
+            print(f"WARNING: {model} failed: {type(e).__name__}: {e}", file=sys.stderr)
+            continue
+        print(f"LLM {model}: first token after {first_token:.1f}s, finished in {total:.1f}s "
+              f"({len(text)} chars).")
+        if text.strip():
+            return text.strip(), model
+        print(f"WARNING: {model} returned empty content.", file=sys.stderr)
+    return "", ""
+
+
 def normalize_base_url(base_url: str) -> str:
     # OpenAI client expects base_url like https://host/v1
     base_url = base_url.rstrip("/")
@@ -281,6 +1082,55 @@ def main() -> int:
     parser.add_argument("--api-key", dest="api_key", default=env("LLM_API_KEY"))
     parser.add_argument("--temperature", type=float, default=env_float("LLM_TEMPERATURE", 0.2))
     parser.add_argument("--max-tokens", type=int, default=env_int("LLM_MAX_TOKENS", 8192))
+    parser.add_argument(
+        "--fallback-model",
+        default=env("LLM_FALLBACK_MODEL"),
+        help="Model to try when the primary one fails or times out",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=env_float("LLM_TIMEOUT", LLM_TIMEOUT),
+        help="Deadline in seconds for each streamed completion",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=env_float("LLM_IDLE_TIMEOUT", LLM_IDLE_TIMEOUT),
+        help="Seconds to wait for the next streamed chunk before giving up on a call",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=env_float("CHANGELOG_DEADLINE", LLM_DEADLINE),
+        help="Seconds for all LLM calls of the run; past it the changelog is built from commit subjects",
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=["auto", "single", "map-reduce"],
+        default=env("CHANGELOG_STRATEGY", "auto"),
+        help="single: one truncated call; map-reduce: summarize commit chunks first; "
+             "auto: map-reduce when the commits would not fit one call or --summary-cache is set",
+    )
+    parser.add_argument("--chunk-tokens", type=int, default=env_int("LLM_CHUNK_TOKENS", 24_000))
+    parser.add_argument("--map-parallel", type=int, default=env_int("LLM_MAP_PARALLEL", 4))
+    parser.add_argument(
+        "--max-commit-chars",
+        type=int,
+        default=env_int("CHANGELOG_MAX_COMMIT_CHARS", 8_000_000),
+        help="Hard cap on the commit log read before budgeting",
+    )
+    parser.add_argument(
+        "--max-input-tokens",
+        type=int,
+        default=env_int("LLM_MAX_INPUT_TOKENS", 64_000),
+        help="Token budget for the final prompt (instructions, commits and diff summary)",
+    )
+    parser.add_argument(
+        "--summary-cache",
+        default=env("CHANGELOG_SUMMARY_CACHE"),
+        help="JSON file mapping commit SHAs to condensed notes, reused across runs",
+    )
     args = parser.parse_args()
 
     if not args.new_tag:
@@ -295,39 +1145,126 @@ def main() -> int:
         print(f"ERROR: instructions file not found: {args.instruct_path}", file=sys.stderr)
         return 2
 
-    all_tags = get_all_tags()
-    prev_tag = args.prev_tag or previous_tag_for(args.new_tag, all_tags)
+    deadline = time.monotonic() + args.deadline
 
-    end_ref = args.new_tag if tag_exists(args.new_tag) else "HEAD"
-    rng = git_range_or_initial(prev_tag, end_ref)
-
-    commits = collect_commits(rng)
-    diff_summary = collect_diff_summary(rng)
-    repo_url = repo_https_url()
-    user_context = build_user_context(repo_url, prev_tag, args.new_tag, commits, diff_summary)
+    # The git lookups are independent subprocesses; run them side by side
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        all_tags_f = pool.submit(get_all_tags)
+        by_creation_f = pool.submit(get_tags_by_creation)
+        tag_exists_f = pool.submit(tag_exists, args.new_tag)
+        repo_url_f = pool.submit(repo_https_url)
+        prev_tag = args.prev_tag or previous_tag_for(args.new_tag, all_tags_f.result(), by_creation_f.result())
+        end_ref = args.new_tag if tag_exists_f.result() else "HEAD"
+        rng = git_range_or_initial(prev_tag, end_ref)
+        repo_url = repo_url_f.result()
 
     with open(args.instruct_path, "r", encoding="utf-8") as f:
         system_instructions = f.read().strip()
 
     base_url = normalize_base_url(args.base_url or "https://api.openai.com/v1")
-    client = OpenAI(base_url=base_url, api_key=args.api_key)
-
-    messages = [
-        {"role": "system", "content": system_instructions},
-        {"role": "user", "content": user_context},
-    ]
+    # The client timeout applies to every read, i.e. it is the per-chunk idle timeout when streaming
+    client = OpenAI(base_url=base_url, api_key=args.api_key, timeout=args.idle_timeout, max_retries=1)
+
+    # The diff summary streams its own git process while the log is read here
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        diff_summary_f = pool.submit(collect_diff_summary, rng)
+        commit_lines, truncated = collect_commit_lines(rng, args.max_commit_chars)
+        diff_summary = diff_summary_f.result()
+
+    total_commits = len(commit_lines)
+    commit_lines, dropped = dedupe_commits(commit_lines)
+    deduped_lines = list(commit_lines)  # for the deterministic fallback
+    diff_summary, commit_budget = budget_prompt(
+        system_instructions, diff_summary, repo_url, prev_tag, args.new_tag, args.model, args.max_input_tokens
+    )
+    commit_tokens = sum(count_tokens(line, args.model) + 1 for line in commit_lines)
+    single_fits = not truncated and commit_tokens <= commit_budget
 
-    completion = client.chat.completions.create(
-        model=args.model,
-        messages=messages,
-        temperature=args.temperature,
-        top_p=0.9,
-        max_tokens=args.max_tokens,
+    cache = load_summary_cache(args.summary_cache)
+    sections_used: Dict[str, str] = {}  # merged blocks and final sections from this run
+    use_notes = args.strategy == "map-reduce" or (
+        args.strategy == "auto" and (not single_fits or bool(args.summary_cache))
     )
-    content = (completion.choices[0].message.content or "").strip()
+
+    models = [args.model] + [m for m in [args.fallback_model] if m and m != args.model]
+    section_models = models
+    user_context: Optional[str] = None
+    if use_notes:
+        if truncated:
+            print(f"WARNING: commit log exceeds {args.max_commit_chars} chars; the oldest commits are omitted.",
+                  file=sys.stderr)
+        for model in models:
+            # Notes from a failed attempt stay in the cache, so the next model only does the rest.
+            # Fallback notes are kept for this run only, so a rerun asks the primary model again.
+            commit_notes = cache["commits"] if model == args.model else dict(cache["commits"])
+            try:
+                note_lines = summarize_commits(
+                    client, model, commit_lines, args.chunk_tokens, args.temperature, args.map_parallel,
+                    commit_notes, args.timeout, deadline,
+                )
+                notes = collapse_notes(
+                    client, model, note_lines, min(args.chunk_tokens, commit_budget), args.temperature,
+                    args.map_parallel, cache["sections"], sections_used, args.timeout, deadline,
+                )
+                user_context = build_user_context(
+                    repo_url, prev_tag, args.new_tag, notes, diff_summary, commits_label="COMMIT NOTES"
+                )
+                system_instructions = system_instructions + "\n" + REDUCE_NOTE
+                break
+            except Exception as e:  # timeouts, provider and transport errors alike
+                print(f"WARNING: map-reduce with {model} failed: {type(e).__name__}: {e}", file=sys.stderr)
+            finally:
+                # Keep whatever was summarized, even if a later chunk failed
+                save_summary_cache(args.summary_cache, cache)
+        if user_context is None and time.monotonic() < deadline:
+            # Last LLM attempt: one call over the truncated commit list
+            section_models = models[-1:]
+            print(f"Falling back to a single truncated call with {section_models[0]}.")
+
+    if user_context is None and time.monotonic() < deadline:
+        if not single_fits:
+            commit_lines, dropped["low_churn"] = fit_commits(
+                commit_lines, commit_churn(rng), args.model, commit_budget
+            )
+            commit_lines.append(
+                f"\n[... {dropped['low_churn']} commits with smaller diffs omitted to fit the token budget ...]\n"
+            )
+        elif truncated:
+            commit_lines.append("\n[... truncated commit list ...]\n")
+        user_context = build_user_context(repo_url, prev_tag, args.new_tag, "\n".join(commit_lines), diff_summary)
+
+    content = ""
+    if user_context is not None:
+        print(
+            f"Budget: {total_commits} commits in range; dropped {dropped['merges']} merges, "
+            f"{dropped['reverted']} reverted/revert commits, folded {dropped['similar']} similar subjects"
+            + (f", omitted {dropped['low_churn']} smaller commits" if dropped.get("low_churn") else "")
+            + f"; prompt ~{count_tokens(system_instructions + user_context, args.model)} tokens "
+            f"(limit {args.max_input_tokens}, {'tiktoken' if get_encoder(args.model) else 'estimated'})."
+        )
+
+        section_key = section_cache_key(args.model, system_instructions, user_context)
+        content = cache["sections"].get(section_key, "")
+        if content:
+            print("Reusing cached changelog section (same model and context).")
+        else:
+            content, used_model = generate_section(
+                client, section_models, system_instructions, user_context, args.temperature, args.max_tokens,
+                args.timeout, deadline,
+            )
+            # Fallback output is not cached, so a rerun tries the primary model again
+            if used_model != args.model:
+                section_key = ""
+        if content and section_key and args.summary_cache:
+            # Drop sections this run did not touch so the cache does not grow without bound
+            sections_used[section_key] = content
+            cache["sections"] = sections_used
+            save_summary_cache(args.summary_cache, cache)
+
     if not content:
-        print("ERROR: LLM returned empty content.", file=sys.stderr)
-        return 2
+        print("WARNING: no usable LLM output; writing a changelog grouped from commit subjects instead.",
+              file=sys.stderr)
+        content = deterministic_section(args.new_tag, deduped_lines, cache["commits"])
 
     header_line = f"## [{args.new_tag}] - {dt.date.today().isoformat()}"
     if not content.lstrip().startswith("## ["):
@@ -3,24 +3,50 @@
 Replay Generator for LMVersus-U
 
 Loads a Premium spec, feeds questions from the associated question set
-to the LLM API sequentially, and saves the results as replay files.
+to the LLM API (sequentially, or with bounded concurrency), and saves the
+results as replay files.
 
 Usage:
-    python replay_generator.py [--auto] [--output-dir <path>] [--limit <n>] [--resume <n>]
+    python replay_generator.py [--auto] [--output-dir <path>] [--limit <n> | --sample <n>] [--resume <n>]
 
 Options:
     --auto          Process all questions without waiting for Enter key
     --output-dir    Custom output directory (default: ./replay_output/{spec_id}/)
     --limit         Process only the first N questions
+    --sample        Process a stratified sample of N questions instead; strata come from
+                    --stratify-by (default: category,difficulty), picked with --seed
     --resume        Resume from question index N (1-based). Use 0 to auto-resume from
                     the first missing replay file in the output directory.
+    --concurrency   Max in-flight API requests (requires --auto when > 1)
+    --manifest-order
+                    Keep manifest order; by default concurrent runs dispatch the
+                    longest expected questions first (see --history-dir)
+    --hedge         Duplicate requests slower than the run's p95 (see --hedge-* options)
+    --breaker-failures / --breaker-cooldown
+                    Circuit breaker for specs that list several provider.endpoints
+    --watch         Daemon mode: poll LLM-Configs/*.json and question set manifests
+                    (--watch-interval) and generate only missing replays; not combinable
+                    with --limit, --sample or --resume
+    --json-style    Replay encoding: pretty (default) or compact
+    --fsync         fsync policy for replay files: none (default, like the page cache
+                    writes of earlier versions), batch (fsync every file, the directory
+                    once per batch) or always (every file and the directory per file)
+    --writer-queue-size / --writer-batch-size
+                    Bounded queue and batch size of the background replay writer
 """
 
 import argparse
+import asyncio
 import json
+import math
 import os
+import queue
+import random
+import re
 import sys
+import threading
 import time
+from collections import deque
 from pathlib import Path
 from typing import Any
 
@@ -54,6 +80,43 @@ def resolve_env_secret(value: str) -> str:
     return os.environ.get(env_name, "").strip()
 
 
+def load_premium_spec(json_file: Path) -> dict[str, Any] | None:
+    """Load one spec file; returns None unless it is a valid Premium spec."""
+    try:
+        with open(json_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"Warning: Failed to load {json_file}: {e}")
+        return None
+
+    if not isinstance(data, dict) or data.get("mode") != "PREMIUM":
+        return None
+
+    # Resolve environment secrets
+    if "provider" in data:
+        provider = data["provider"]
+        provider["providerName"] = resolve_env_secret(provider.get("providerName", ""))
+        provider["apiUrl"] = resolve_env_secret(provider.get("apiUrl", ""))
+        provider["apiKey"] = resolve_env_secret(provider.get("apiKey", ""))
+        # Optional extra endpoints (each with its own ENV: secrets and weight); an entry
+        # without apiUrl uses the provider's, one without an apiKey is rejected
+        if provider.get("endpoints"):
+            endpoints = []
+            for i, endpoint in enumerate(provider["endpoints"], 1):
+                endpoint["apiUrl"] = resolve_env_secret(endpoint.get("apiUrl", "")) or provider["apiUrl"]
+                endpoint["apiKey"] = resolve_env_secret(endpoint.get("apiKey", ""))
+                if not endpoint["apiKey"]:
+                    print(f"Warning: {json_file.name}: endpoint {endpoint.get('name') or i} "
+                          f"has no apiKey; ignoring it")
+                    continue
+                endpoints.append(endpoint)
+            if not endpoints:
+                print(f"Warning: {json_file.name}: no endpoint has an apiKey; skipping spec")
+                return None
+            provider["endpoints"] = endpoints
+    return data
+
+
 def load_premium_specs() -> list[dict[str, Any]]:
     """Load all Premium specs from LLM-Configs directory."""
     specs: list[dict[str, Any]] = []
@@ -62,20 +125,9 @@ def load_premium_specs() -> list[dict[str, Any]]:
         return specs
 
     for json_file in LLM_CONFIGS_DIR.glob("*.json"):
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            if isinstance(data, dict) and data.get("mode") == "PREMIUM":
-                # Resolve environment secrets
-                if "provider" in data:
-                    provider = data["provider"]
-                    provider["providerName"] = resolve_env_secret(provider.get("providerName", ""))
-                    provider["apiUrl"] = resolve_env_secret(provider.get("apiUrl", ""))
-                    provider["apiKey"] = resolve_env_secret(provider.get("apiKey", ""))
-                specs.append(data)
-        except (json.JSONDecodeError, OSError) as e:
-            print(f"Warning: Failed to load {json_file}: {e}")
+        spec = load_premium_spec(json_file)
+        if spec is not None:
+            specs.append(spec)
     return specs
 
 
@@ -83,49 +135,228 @@ def load_premium_specs() -> list[dict[str, Any]]:
 # Question Loading
 # ─────────────────────────────────────────────────────────────────────────────
 
-def load_questions(question_set_path: str) -> list[dict[str, Any]]:
-    """Load questions from a question set directory."""
-    # Resolve relative paths from repo root
-    base_dir = Path(__file__).parent
-    question_dir = base_dir / question_set_path
+def resolve_question_dir(question_set_path: str) -> Path:
+    """Resolve a questionSetPath relative to the repo root."""
+    return Path(__file__).parent / question_set_path
+
 
-    manifest_path = question_dir / "manifest.json"
+def load_question_ids(question_set_path: str) -> list[str] | None:
+    """Load the ordered questionIds from a question set manifest (None on error)."""
+    manifest_path = resolve_question_dir(question_set_path) / "manifest.json"
     if not manifest_path.is_file():
         print(f"Error: Manifest not found at {manifest_path}")
-        return []
+        return None
 
     try:
         with open(manifest_path, "r", encoding="utf-8") as f:
             manifest = json.load(f)
         if not isinstance(manifest, dict):
             print(f"Error: Manifest at {manifest_path} is not a dictionary.")
-            return []
+            return None
     except (json.JSONDecodeError, OSError) as e:
         print(f"Error: Failed to load manifest: {e}")
-        return []
+        return None
+
+    return [str(qid) for qid in manifest.get("questionIds", [])]
+
+
+class QuestionRecord:
+    """
+    Compact in-memory form of one question file.
+
+    Keeps only what scheduling, determine_expected_kind and the multiple-choice /
+    integer verifier hints need. The full JSON (prompt, choices, rubric, localized
+    text, ...) is re-read on demand via data() and held only while a generation
+    has acquire()d it, so a large question set costs a few hundred bytes per
+    question instead of its parsed JSON.
+    """
 
-    questions: list[dict[str, Any]] = []
-    questions_dir = question_dir / "questions"
+    __slots__ = (
+        "question_id", "file_id", "questions_dir", "category", "difficulty",
+        "prompt_chars", "has_choices", "verifier_type", "verifier_value", "_data", "_users"
+    )
+
+    def __init__(self, file_id: str, questions_dir: Path, data: dict[str, Any]) -> None:
+        question_id = data.get("questionId", "unknown")
+        self.question_id = file_id if question_id == file_id else question_id
+        self.file_id = file_id
+        self.questions_dir = questions_dir  # shared by every record of the set
+        self.category = _intern((data.get("metadata") or {}).get("category"))
+        self.difficulty = _intern(data.get("difficulty"))
+        self.prompt_chars = len(data.get("prompt", ""))
+        self.has_choices = bool(data.get("choices"))
+
+        verifier_spec = data.get("verifierSpec", {})
+        self.verifier_type = _intern(verifier_spec.get("type", ""))
+        if self.verifier_type == "multiple_choice":
+            self.verifier_value = verifier_spec.get("correctIndex", 0)
+        elif self.verifier_type == "integer_range":
+            self.verifier_value = verifier_spec.get("correctValue", 0)
+        else:
+            self.verifier_value = None
+        self._data: dict[str, Any] | None = None
+        self._users = 0
+
+    def data(self) -> dict[str, Any]:
+        """The full question JSON, read from disk unless a generation holds it."""
+        data = self._data
+        if data is None:
+            data = read_question_file(self.questions_dir / f"{self.file_id}.json")
+        return data
+
+    def acquire(self) -> dict[str, Any]:
+        """Load the full JSON and keep it until the matching release()."""
+        data = self.data()
+        self._data = data
+        self._users += 1
+        return data
+
+    def release(self) -> None:
+        self._users = max(0, self._users - 1)
+        if not self._users:
+            self._data = None
+
+
+def _intern(value: Any) -> Any:
+    """Share repeated short strings (category, difficulty, verifier type) across records."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def read_question_file(question_file: Path) -> dict[str, Any]:
+    """Parse one question file; raises OSError or ValueError (incl. JSONDecodeError)."""
+    with open(question_file, "r", encoding="utf-8") as f:
+        question_data = json.load(f)
+    if not isinstance(question_data, dict):
+        raise ValueError(f"Question data in {question_file} is not a dictionary.")
+    return question_data
+
+
+def load_questions(question_set_path: str, question_ids: list[str] | None = None) -> list[QuestionRecord]:
+    """Load questions from a question set directory (optionally only question_ids)."""
+    if question_ids is None:
+        question_ids = load_question_ids(question_set_path)
+        if question_ids is None:
+            return []
 
-    for question_id in manifest.get("questionIds", []):
+    questions: list[QuestionRecord] = []
+    questions_dir = resolve_question_dir(question_set_path) / "questions"
+
+    for question_id in question_ids:
         question_file = questions_dir / f"{question_id}.json"
         if not question_file.is_file():
             print(f"Warning: Question file not found: {question_file}")
             continue
 
         try:
-            with open(question_file, "r", encoding="utf-8") as f:
-                question_data = json.load(f)
-            if isinstance(question_data, dict):
-                questions.append(question_data)
-            else:
-                print(f"Warning: Question data in {question_file} is not a dictionary.")
+            questions.append(QuestionRecord(question_id, questions_dir, read_question_file(question_file)))
         except (json.JSONDecodeError, OSError) as e:
             print(f"Warning: Failed to load question {question_id}: {e}")
+        except ValueError as e:
+            print(f"Warning: {e}")
 
     return questions
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Stratified Sampling
+# ─────────────────────────────────────────────────────────────────────────────
+
+_JSON_SCALAR = r'("(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?|true|false|null)'
+_field_patterns: dict[str, re.Pattern[str]] = {}
+
+
+def scan_json_field(text: str, field: str) -> str:
+    """
+    Return the first scalar value of `"field": ...` in raw JSON text, as a string.
+
+    This is a regex scan rather than a full parse, so sampling never builds the
+    (large) question dicts; a nested key with the same name may match first.
+    """
+    pattern = _field_patterns.get(field)
+    if pattern is None:
+        pattern = _field_patterns[field] = re.compile(rf'"{re.escape(field)}"\s*:\s*{_JSON_SCALAR}')
+    m = pattern.search(text)
+    if not m:
+        return ""
+    try:
+        value = json.loads(m.group(1))
+    except json.JSONDecodeError:
+        return ""
+    return "" if value is None else str(value)
+
+
+def read_strata_key(question_file: Path, fields: list[str]) -> tuple[str, ...]:
+    """Read the stratification key of one question file without parsing it."""
+    try:
+        with open(question_file, "r", encoding="utf-8") as f:
+            text = f.read()
+    except OSError:
+        return tuple("" for _ in fields)
+    # A question without a difficulty loads as MEDIUM, so it belongs to that stratum
+    return tuple(
+        scan_json_field(text, field) or (DEFAULT_DIFFICULTY if field == "difficulty" else "")
+        for field in fields
+    )
+
+
+def stratified_sample(
+        question_set_path: str,
+        question_ids: list[str],
+        sample_size: int,
+        fields: list[str],
+        seed: int
+) -> list[str]:
+    """
+    Pick `sample_size` question IDs with each stratum (combination of `fields`)
+    represented in proportion to its size, using largest-remainder allocation and
+    at least one question per stratum when the sample is large enough.
+
+    The result keeps manifest order and depends only on the manifest, the fields
+    and the seed, so reruns with --resume see the same subset.
+    """
+    if sample_size >= len(question_ids):
+        return list(question_ids)
+
+    questions_dir = resolve_question_dir(question_set_path) / "questions"
+    strata: dict[tuple[str, ...], list[str]] = {}
+    for question_id in question_ids:
+        key = read_strata_key(questions_dir / f"{question_id}.json", fields)
+        strata.setdefault(key, []).append(question_id)
+
+    keys = sorted(strata)
+    total = len(question_ids)
+    quotas = {key: sample_size * len(strata[key]) / total for key in keys}
+    allocation = {key: int(quotas[key]) for key in keys}
+    if sample_size >= len(keys):
+        for key in keys:
+            allocation[key] = max(1, allocation[key])
+    remaining = sample_size - sum(allocation.values())
+
+    # Hand out what is left by largest remainder (or take back from the largest strata)
+    by_remainder = sorted(keys, key=lambda k: (quotas[k] - int(quotas[k]), len(strata[k])), reverse=True)
+    while remaining > 0:
+        for key in by_remainder:
+            if remaining == 0:
+                break
+            if allocation[key] < len(strata[key]):
+                allocation[key] += 1
+                remaining -= 1
+    while remaining < 0:
+        shrinkable = [k for k in keys if allocation[k] > 1] or [k for k in keys if allocation[k] > 0]
+        key = max(shrinkable, key=lambda k: allocation[k] - quotas[k])
+        allocation[key] -= 1
+        remaining += 1
+
+    rng = random.Random(seed)
+    chosen: set[str] = set()
+    for key in keys:
+        chosen.update(rng.sample(strata[key], allocation[key]))
+
+    print(f"Stratified sample: {len(chosen)} of {total} question(s) across {len(keys)} strata "
+          f"by {', '.join(fields)} (seed {seed})")
+    return [qid for qid in question_ids if qid in chosen]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Resume Helpers
 # ─────────────────────────────────────────────────────────────────────────────
@@ -134,7 +365,7 @@ def collect_existing_replay_ids(output_dir: Path) -> set[str]:
     """
     Collect question IDs that already have replay files in output_dir/replays/.
 
-    We use the filename stem as the questionId because save_replay() writes
+    We use the filename stem as the questionId because ReplayWriter writes
     {questionId}.json.
     """
     replays_dir = output_dir / "replays"
@@ -145,7 +376,7 @@ def collect_existing_replay_ids(output_dir: Path) -> set[str]:
 
 def compute_resume_index(
         resume_arg: int,
-        questions: list[dict[str, Any]],
+        questions: list[QuestionRecord],
         existing_ids: set[str]
 ) -> int:
     """
@@ -159,8 +390,7 @@ def compute_resume_index(
 
     if resume_arg == 0:
         for idx, q in enumerate(questions):
-            qid = q.get("questionId", "unknown")
-            if qid not in existing_ids:
+            if q.question_id not in existing_ids:
                 return idx
         return len(questions)  # everything already done
 
@@ -173,25 +403,125 @@ def compute_resume_index(
     return start
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Scheduling
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Mirrors the server's Difficulty enum; a question file without one loads as MEDIUM
+DEFAULT_DIFFICULTY = "MEDIUM"
+DIFFICULTY_WEIGHTS = {"VERY_EASY": 0.4, "EASY": 0.6, "MEDIUM": 0.8, "HARD": 1.0, "VERY_HARD": 1.3}
+
+
+def question_difficulty(question: QuestionRecord) -> str:
+    return str(question.difficulty or DEFAULT_DIFFICULTY).upper()
+
+
+def question_group(question: QuestionRecord) -> str:
+    """Grouping key for length prediction: metadata category when present, else difficulty."""
+    return str(question.category or question_difficulty(question))
+
+
+def read_history_token_count(replay_file: Path) -> int | None:
+    """Return replay.reasoningTokenCount from an earlier replay file, if readable."""
+    try:
+        with open(replay_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        count = data.get("replay", {}).get("reasoningTokenCount")
+    except (json.JSONDecodeError, OSError, AttributeError):
+        return None
+    return count if isinstance(count, int) and count > 0 else None
+
+
+def predict_output_lengths(
+        questions: list[QuestionRecord],
+        history_dirs: list[Path],
+        exclude_dir: Path | None = None
+) -> dict[str, float]:
+    """
+    Predict each question's completion length in reasoning tokens.
+
+    Questions answered before by other specs (any <dir>/*/replays/{questionId}.json
+    under history_dirs, or <dir>/replays/ directly) use the mean of their
+    reasoningTokenCount. The rest fall back to a proxy: the mean of their group
+    (category or difficulty) scaled by relative prompt length, or, with no
+    history at all, prompt length weighted by difficulty.
+    """
+    replay_dirs: list[Path] = []
+    for history_dir in history_dirs:
+        candidates = [history_dir / "replays"] + sorted(history_dir.glob("*/replays"))
+        for replays_dir in candidates:
+            if not replays_dir.is_dir():
+                continue
+            if exclude_dir is not None and replays_dir.parent.resolve() == exclude_dir.resolve():
+                continue
+            replay_dirs.append(replays_dir)
+
+    predicted: dict[str, float] = {}
+    group_tokens: dict[str, list[float]] = {}
+    group_prompt_chars: dict[str, list[int]] = {}
+    for question in questions:
+        question_id = question.question_id
+        counts = [
+            count for count in (read_history_token_count(d / f"{question_id}.json") for d in replay_dirs)
+            if count is not None
+        ]
+        if counts:
+            predicted[question_id] = sum(counts) / len(counts)
+            group = question_group(question)
+            group_tokens.setdefault(group, []).append(predicted[question_id])
+            group_prompt_chars.setdefault(group, []).append(max(1, question.prompt_chars))
+
+    all_tokens = [t for tokens in group_tokens.values() for t in tokens]
+    for question in questions:
+        question_id = question.question_id
+        if question_id in predicted:
+            continue
+        prompt_chars = max(1, question.prompt_chars)
+        group = question_group(question)
+        tokens = group_tokens.get(group) or all_tokens
+        if tokens:
+            chars = group_prompt_chars.get(group) or [c for cs in group_prompt_chars.values() for c in cs]
+            mean_tokens = sum(tokens) / len(tokens)
+            mean_chars = sum(chars) / len(chars)
+            # Prompt length only nudges the estimate; the group mean dominates
+            predicted[question_id] = mean_tokens * (0.5 + 0.5 * prompt_chars / mean_chars)
+        else:
+            weight = DIFFICULTY_WEIGHTS.get(question_difficulty(question), DIFFICULTY_WEIGHTS[DEFAULT_DIFFICULTY])
+            predicted[question_id] = prompt_chars * weight
+
+    return predicted
+
+
+def schedule_longest_first(
+        order: list[int],
+        questions: list[QuestionRecord],
+        predicted: dict[str, float]
+) -> list[int]:
+    """Sort question indices by predicted length, longest first (stable on ties)."""
+    return sorted(
+        order,
+        key=lambda idx: -predicted.get(questions[idx].question_id, 0.0)
+    )
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Prompt Building (matching OpenAIApiDao.buildPromptParts)
 # ─────────────────────────────────────────────────────────────────────────────
 
-def determine_expected_kind(question: dict[str, Any]) -> str:
+def determine_expected_kind(question: QuestionRecord) -> str:
     """Determine the expected answer kind based on question structure."""
-    if question.get("choices"):
+    if question.has_choices:
         return "multiple_choice"
-    verifier_spec = question.get("verifierSpec", {})
-    verifier_type = verifier_spec.get("type", "")
-    if verifier_type == "integer_range":
+    if question.verifier_type == "integer_range":
         return "integer"
     return "free_text"
 
 
-def build_prompts(question: dict[str, Any]) -> tuple[str, str]:
+def build_prompts(question: QuestionRecord) -> tuple[str, str]:
     """Build system and user prompts for the LLM."""
-    prompt = question.get("prompt", "").strip()
-    choices = question.get("choices")
+    data = question.data()
+    prompt = data.get("prompt", "").strip()
+    choices = data.get("choices")
     expected_kind = determine_expected_kind(question)
 
     # Build user prompt
@@ -276,23 +606,51 @@ def extract_json_object(text: str) -> dict[str, Any] | None:
     return None
 
 
-def call_llm_api(
+_clients: dict[tuple[str, str], "openai.AsyncOpenAI"] = {}
+
+
+def get_async_client(api_key: str, api_url: str) -> "openai.AsyncOpenAI":
+    """Return a shared async client per (apiKey, apiUrl) so connections are reused."""
+    key = (api_key, api_url)
+    client = _clients.get(key)
+    if client is None:
+        client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=api_url if api_url else None
+        )
+        _clients[key] = client
+    return client
+
+
+async def close_async_clients() -> None:
+    """Close all shared clients (must run on the loop that created them)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.close()
+
+
+async def call_llm_api(
         spec: dict[str, Any],
-        question: dict[str, Any]
+        question: QuestionRecord,
+        endpoint: dict[str, Any] | None = None
 ) -> tuple[str | None, dict[str, Any] | None, dict[str, Any]]:
     """
     Call the LLM API and return (reasoning, final_answer, usage_info).
 
+    `endpoint` overrides the provider's apiUrl/apiKey (see EndpointRouter).
+
     Returns:
         - reasoning: The reasoning text (if available)
         - final_answer: The parsed finalAnswer dict
-        - usage_info: Token usage information
+        - usage_info: Token usage information (empty if the request itself failed)
     """
     provider = spec.get("provider", {})
     llm_profile = spec.get("llmProfile", {})
+    target = endpoint or provider
 
-    api_key = provider.get("apiKey", "")
-    api_url = provider.get("apiUrl", "")
+    api_key = target.get("apiKey", "")
+    api_url = target.get("apiUrl", "")
     model = llm_profile.get("modelName", "")
     temperature = llm_profile.get("temperature", 0.6)
     max_tokens = llm_profile.get("maxTokens", 4096)
@@ -305,10 +663,7 @@ def call_llm_api(
     system_prompt, user_prompt = build_prompts(question)
 
     # Configure OpenAI client
-    client = openai.OpenAI(
-        api_key=api_key,
-        base_url=api_url if api_url else None
-    )
+    client = get_async_client(api_key, api_url)
 
     # Determine response format based on compat settings
     compat = provider.get("compat", {})
@@ -338,7 +693,7 @@ def call_llm_api(
         if extra_body:
             kwargs["extra_body"] = extra_body
 
-        response = client.chat.completions.create(**kwargs)
+        response = await client.chat.completions.create(**kwargs)
         elapsed_time = time.time() - start_time
 
     except Exception as e:
@@ -378,27 +733,352 @@ def call_llm_api(
     return reasoning, final_answer, usage_info
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Endpoint Routing
+# ─────────────────────────────────────────────────────────────────────────────
+
+LlmResult = tuple[str | None, dict[str, Any] | None, dict[str, Any]]
+
+
+class Endpoint:
+    """Runtime state of one apiUrl/apiKey pair of a spec."""
+
+    def __init__(self, name: str, api_url: str, api_key: str, weight: float) -> None:
+        self.name = name
+        self.api_url = api_url
+        self.api_key = api_key
+        self.weight = weight
+
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.ewma_latency: float | None = None
+        self.ewma_error = 0.0
+        self.open_until = 0.0  # 0 while the breaker is closed
+        self.probing = False
+        self.trips = 0
+
+    @property
+    def tripped(self) -> bool:
+        return self.open_until > 0
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
+
+    def is_available(self, now: float) -> bool:
+        """Closed, or half-open with no probe in flight yet."""
+        return not self.tripped or (now >= self.open_until and not self.probing)
+
+
+class EndpointRouter:
+    """
+    Routes a spec's requests across its endpoints.
+
+    A spec may list `provider.endpoints` ([{"apiUrl", "apiKey", "weight", "name"}],
+    apiUrl defaulting to the provider's); without it the provider's own
+    apiUrl/apiKey is the single endpoint.
+    Each request goes to the endpoint with the most spare capacity, where
+    capacity = weight * (1 - error rate) / latency, both tracked as EWMAs.
+    After `failure_threshold` consecutive request errors the circuit opens and
+    the endpoint is skipped for `cooldown` seconds. It then turns half-open and
+    gets a single probe request: success closes the circuit, failure reopens it
+    for another cooldown. When every endpoint is open, requests wait for the
+    first cooldown to end instead of being dispatched.
+    """
+
+    EWMA_ALPHA = 0.2
+    PROBE_POLL = 0.5
+
+    def __init__(
+            self,
+            endpoints: list[Endpoint],
+            failure_threshold: int = 3,
+            cooldown: float = 30.0
+    ) -> None:
+        self.endpoints = endpoints
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+
+    @classmethod
+    def from_spec(cls, spec: dict[str, Any], **kwargs: Any) -> "EndpointRouter":
+        provider = spec.get("provider", {})
+        raw_endpoints = provider.get("endpoints") or [provider]
+        endpoints = []
+        for i, raw in enumerate(raw_endpoints, 1):
+            name = raw.get("name") or f"{provider.get('providerName') or 'endpoint'}#{i}"
+            weight = float(raw.get("weight", 1.0))
+            if weight <= 0:
+                continue
+            endpoints.append(Endpoint(name, raw.get("apiUrl", ""), raw.get("apiKey", ""), weight))
+        return cls(endpoints, **kwargs)
+
+    def _capacity(self, endpoint: Endpoint) -> float:
+        known = [e.ewma_latency for e in self.endpoints if e.ewma_latency is not None]
+        latency = endpoint.ewma_latency or (sum(known) / len(known) if known else 1.0)
+        return endpoint.weight * max(0.05, 1.0 - endpoint.ewma_error) / max(latency, 1e-3)
+
+    def pick(self) -> Endpoint | None:
+        """
+        Choose the available endpoint with the lowest in-flight load relative to its
+        capacity, or None when every endpoint is open or already being probed.
+        """
+        now = time.monotonic()
+        available = [e for e in self.endpoints if e.is_available(now)]
+        if not available:
+            return None
+        endpoint = min(available, key=lambda e: (e.in_flight + 1) / self._capacity(e))
+        if endpoint.tripped:
+            endpoint.probing = True
+        return endpoint
+
+    async def acquire(self) -> Endpoint | None:
+        """pick(), waiting out the cooldown while no endpoint is available."""
+        if not self.endpoints:
+            return None
+        while True:
+            endpoint = self.pick()
+            if endpoint is not None:
+                return endpoint
+            now = time.monotonic()
+            pending = [e.open_until - now for e in self.endpoints if e.is_open(now)]
+            # Only probes in flight: poll until one of them settles
+            await asyncio.sleep(min(pending) if pending else self.PROBE_POLL)
+
+    def record(self, endpoint: Endpoint, elapsed: float, ok: bool, probe: bool = False) -> None:
+        alpha = self.EWMA_ALPHA
+        endpoint.requests += 1
+        endpoint.ewma_error = (1 - alpha) * endpoint.ewma_error + alpha * (0.0 if ok else 1.0)
+        if probe:
+            endpoint.probing = False
+        if ok:
+            endpoint.consecutive_errors = 0
+            if endpoint.tripped:
+                endpoint.open_until = 0.0
+                print(f"  ✓ Endpoint {endpoint.name} back in rotation")
+            if endpoint.ewma_latency is None:
+                endpoint.ewma_latency = elapsed
+            else:
+                endpoint.ewma_latency = (1 - alpha) * endpoint.ewma_latency + alpha * elapsed
+            return
+
+        endpoint.errors += 1
+        if probe:
+            # Failed probe: stay open for another cooldown
+            endpoint.open_until = time.monotonic() + self.cooldown
+            return
+        if endpoint.tripped:
+            # A request dispatched before the trip; the breaker is already open
+            return
+        endpoint.consecutive_errors += 1
+        if endpoint.consecutive_errors >= self.failure_threshold:
+            endpoint.consecutive_errors = 0
+            endpoint.open_until = time.monotonic() + self.cooldown
+            endpoint.trips += 1
+            print(f"  ⚠ Endpoint {endpoint.name} taken out of rotation for {self.cooldown:g}s")
+
+    async def call(self, spec: dict[str, Any], question: QuestionRecord) -> LlmResult:
+        endpoint = await self.acquire()
+        if endpoint is None:
+            print("Error: no usable endpoint configured")
+            return None, None, {}
+
+        probe = endpoint.tripped
+        endpoint.in_flight += 1
+        started = time.monotonic()
+        try:
+            result = await call_llm_api(
+                spec, question, {"apiUrl": endpoint.api_url, "apiKey": endpoint.api_key}
+            )
+        except BaseException:
+            if probe:
+                endpoint.probing = False
+            raise
+        finally:
+            endpoint.in_flight -= 1
+        if not endpoint.api_key:
+            # A configuration error, not an endpoint failure: keep the breaker out of it
+            if probe:
+                endpoint.probing = False
+            return result
+        # An empty usage_info means the request itself failed (not just an unparsable answer)
+        self.record(endpoint, time.monotonic() - started, ok=bool(result[2]), probe=probe)
+        return result
+
+    def print_stats(self, spec_id: str) -> None:
+        if len(self.endpoints) < 2 and not any(e.errors for e in self.endpoints):
+            return
+        print(f"Endpoints ({spec_id}):")
+        now = time.monotonic()
+        for e in self.endpoints:
+            latency = f"{e.ewma_latency:.2f}s" if e.ewma_latency is not None else "n/a"
+            state = "closed" if not e.tripped else "open" if e.is_open(now) else "half-open"
+            print(
+                f"  {e.name}: {e.requests} request(s), {e.errors} error(s), "
+                f"latency~{latency}, weight {e.weight:g}, breaker {state} (tripped {e.trips}x)"
+            )
+
+
+_routers: dict[str, EndpointRouter] = {}
+
+
+def init_routers(specs: list[dict[str, Any]], failure_threshold: int, cooldown: float) -> None:
+    """Create one EndpointRouter per spec id."""
+    for spec in specs:
+        _routers[spec.get("id", "unknown")] = EndpointRouter.from_spec(
+            spec, failure_threshold=failure_threshold, cooldown=cooldown
+        )
+
+
+def get_router(spec: dict[str, Any]) -> EndpointRouter:
+    spec_id = spec.get("id", "unknown")
+    router = _routers.get(spec_id)
+    if router is None:
+        router = _routers[spec_id] = EndpointRouter.from_spec(spec)
+    return router
+
+
+async def call_spec(spec: dict[str, Any], question: QuestionRecord) -> LlmResult:
+    """Call the LLM for a spec, routed across the spec's endpoints."""
+    return await get_router(spec).call(spec, question)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Request Hedging
+# ─────────────────────────────────────────────────────────────────────────────
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, min(len(sorted_values), math.ceil(pct / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+LATENCY_WINDOW = 1000
+
+
+class Hedger:
+    """
+    Issues a duplicate request when the primary outlives a learned latency percentile.
+
+    The hedge delay is the `pct` percentile of the latest successful primary
+    latencies of the current run (learning starts after `min_samples`). The hedge goes to
+    `fallback_spec` when given, otherwise to the same spec. The first valid
+    finalAnswer wins and the other request is cancelled.
+
+    `max_extra_cost` caps hedging as extra cost: hedges issued may not exceed
+    that fraction of primary requests (0.05 = at most +5% requests).
+    """
+
+    def __init__(
+            self,
+            pct: float = 95.0,
+            min_samples: int = 20,
+            max_extra_cost: float = 0.05,
+            fallback_spec: dict[str, Any] | None = None
+    ) -> None:
+        self.pct = pct
+        self.min_samples = max(1, min_samples)
+        self.max_extra_cost = max(0.0, max_extra_cost)
+        self.fallback_spec = fallback_spec
+
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.primaries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedge_tokens = 0
+
+    def hedge_delay(self) -> float | None:
+        """Seconds to wait before hedging, or None while still learning."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return percentile(sorted(self.latencies), self.pct)
+
+    def try_acquire(self) -> bool:
+        """Reserve budget for one hedge if the extra-cost cap allows it."""
+        if self.hedges + 1 > self.max_extra_cost * self.primaries:
+            return False
+        self.hedges += 1
+        return True
+
+    async def call(self, spec: dict[str, Any], question: QuestionRecord) -> LlmResult:
+        """Call the LLM, hedging once if the primary is slower than the learned percentile."""
+        self.primaries += 1
+        started = time.monotonic()
+        primary = asyncio.create_task(call_spec(spec, question))
+
+        delay = self.hedge_delay()
+        if delay is not None:
+            await asyncio.wait({primary}, timeout=delay)
+        if primary.done() or delay is None or not self.try_acquire():
+            result = await primary
+            if result[1] is not None:
+                self.latencies.append(time.monotonic() - started)
+            return result
+
+        question_id = question.question_id
+        print(f"  ⇉ Hedging {question_id} after {delay:.1f}s")
+        hedge = asyncio.create_task(call_spec(self.fallback_spec or spec, question))
+
+        pending = {primary, hedge}
+        result: LlmResult = (None, None, {})
+        winner: asyncio.Task[LlmResult] | None = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result()[1] is not None:
+                        winner = task
+                        result = task.result()
+                        break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if winner is primary:
+            self.latencies.append(time.monotonic() - started)
+        elif winner is hedge:
+            self.hedge_wins += 1
+            self.hedge_tokens += result[2].get("total_tokens", 0)
+        return result
+
+    def print_stats(self) -> None:
+        """Print the hedge summary for the run report."""
+        if self.primaries == 0:
+            return
+        extra = self.hedges / self.primaries
+        win_rate = self.hedge_wins / self.hedges if self.hedges else 0.0
+        delay = self.hedge_delay()
+        delay_text = f"{delay:.1f}s" if delay is not None else "n/a"
+        print(
+            f"Hedging: {self.hedges} hedge(s) for {self.primaries} request(s) "
+            f"(+{extra:.1%} requests, cap +{self.max_extra_cost:.0%}); "
+            f"hedge win rate {win_rate:.0%} ({self.hedge_wins}/{self.hedges}); "
+            f"p{self.pct:g} delay {delay_text}; winning hedge tokens {self.hedge_tokens}"
+        )
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Replay Saving
 # ─────────────────────────────────────────────────────────────────────────────
 
-def build_embedded_verifier_hint(question: dict[str, Any]) -> dict[str, Any]:
+def build_embedded_verifier_hint(question: QuestionRecord) -> dict[str, Any]:
     """Build the embeddedVerifierHint from the question's verifierSpec."""
-    verifier_spec = question.get("verifierSpec", {})
-    verifier_type = verifier_spec.get("type", "")
+    verifier_type = question.verifier_type
 
     if verifier_type == "multiple_choice":
         return {
             "type": "multiple_choice",
-            "correctIndex": verifier_spec.get("correctIndex", 0)
+            "correctIndex": question.verifier_value
         }
     elif verifier_type == "integer_range":
         return {
             "type": "integer",
-            "correctValue": verifier_spec.get("correctValue", 0)
+            "correctValue": question.verifier_value
         }
     else:
-        # free_response or unknown
+        # free_response or unknown: the rubric can be long, so it is read on demand
+        verifier_spec = question.data().get("verifierSpec", {})
         return {
             "type": "free_response",
             "rubric": verifier_spec.get("rubric"),
@@ -406,15 +1086,14 @@ def build_embedded_verifier_hint(question: dict[str, Any]) -> dict[str, Any]:
         }
 
 
-def save_replay(
-        output_dir: Path,
-        question: dict[str, Any],
+def build_replay_data(
+        question: QuestionRecord,
         reasoning: str | None,
         final_answer: dict[str, Any] | None,
         usage_info: dict[str, Any]
-) -> None:
-    """Save replay data to a JSON file."""
-    question_id = question.get("questionId", "unknown")
+) -> dict[str, Any]:
+    """Build the replay payload written to replays/{questionId}.json."""
+    question_id = question.question_id
 
     # Estimate token count from reasoning
     reasoning_text = reasoning or ""
@@ -425,7 +1104,7 @@ def save_replay(
     completion_tokens = usage_info.get("completion_tokens", 0)
     avg_tps = int(completion_tokens / elapsed) if elapsed > 0 else 40
 
-    replay_data = {
+    return {
         "questionId": question_id,
         "llmReasoning": reasoning_text,
         "llmFinalAnswer": final_answer or {"type": "free_text", "text": ""},
@@ -436,21 +1115,192 @@ def save_replay(
         }
     }
 
-    # Ensure output directory exists
-    replays_dir = output_dir / "replays"
-    replays_dir.mkdir(parents=True, exist_ok=True)
 
-    output_file = replays_dir / f"{question_id}.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(replay_data, f, indent=2, ensure_ascii=False)
+def encode_json(data: Any, json_style: str) -> bytes:
+    """Encode data as UTF-8 JSON, either pretty (indent=2) or compact."""
+    if json_style == "compact":
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+    return text.encode("utf-8")
 
-    print(f"  ✓ Saved replay: {output_file}")
+
+def fsync_directory(directory: Path) -> None:
+    """Flush directory entries (renames) to disk where the platform supports it."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows cannot open directories
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_file_atomic(path: Path, payload: bytes, fsync: bool) -> None:
+    """Write payload to a temp file next to path, then rename it into place."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+FSYNC_POLICIES = ("none", "batch", "always")
+JSON_STYLES = ("pretty", "compact")
+
+
+class ReplayWriter:
+    """
+    Background writer stage for replay files.
+
+    The generation loop hands finished results to submit(), which only blocks
+    when the bounded queue is full. A single worker thread drains the queue in
+    batches, encodes each replay, and writes it atomically (temp file + rename).
+
+    fsync policy:
+        - none:   rely on the OS page cache (fastest, not crash-safe; default)
+        - batch:  fsync every file of a batch (one fsync per replay), then the
+                  directory once per batch
+        - always: fsync each file and the directory after every rename
+    """
+
+    _STOP = object()
+
+    def __init__(
+            self,
+            output_dir: Path,
+            queue_size: int = 64,
+            batch_size: int = 16,
+            json_style: str = "pretty",
+            fsync_policy: str = "none"
+    ) -> None:
+        if json_style not in JSON_STYLES:
+            raise ValueError(f"json_style must be one of {JSON_STYLES}")
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {FSYNC_POLICIES}")
+
+        self.replays_dir = output_dir / "replays"
+        self.batch_size = max(1, batch_size)
+        self.json_style = json_style
+        self.fsync_policy = fsync_policy
+
+        self.written_ids: set[str] = set()
+        self.failed_ids: set[str] = set()
+        self.bytes_written = 0
+        self.busy_seconds = 0.0
+        self.batches = 0
+        self.max_queue_depth = 0
+
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max(1, queue_size))
+        self._dir_ready = False
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="replay-writer", daemon=True)
+        self._thread.start()
+
+    def submit(
+            self,
+            question: QuestionRecord,
+            reasoning: str | None,
+            final_answer: dict[str, Any] | None,
+            usage_info: dict[str, Any]
+    ) -> None:
+        """Queue a replay for writing. Blocks only while the queue is full."""
+        replay_data = build_replay_data(question, reasoning, final_answer, usage_info)
+        self._queue.put(replay_data)
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def flush(self) -> None:
+        """Block until every replay submitted so far has been written (or failed)."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Flush all queued replays and stop the worker thread."""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def print_stats(self) -> None:
+        """Print throughput numbers for the writer stage."""
+        wall = time.monotonic() - self._started_at
+        count = len(self.written_ids)
+        rate = count / self.busy_seconds if self.busy_seconds > 0 else 0.0
+        print(
+            f"Writer: {count} replay(s), {self.bytes_written / 1024:.1f} KiB in {self.batches} batch(es); "
+            f"busy {self.busy_seconds:.2f}s of {wall:.2f}s ({rate:.1f} files/s, "
+            f"fsync={self.fsync_policy}, json={self.json_style}, max queue depth {self.max_queue_depth})"
+        )
+        if self.failed_ids:
+            print(f"Writer: {len(self.failed_ids)} replay(s) failed to write")
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            taken = len(batch)
+            if batch[-1] is self._STOP:
+                batch.pop()
+                stopping = True
+            if batch:
+                self._write_batch(batch)
+            for _ in range(taken):
+                self._queue.task_done()
+
+    def _write_batch(self, batch: list[dict[str, Any]]) -> None:
+        started = time.monotonic()
+        try:
+            if not self._dir_ready:
+                self.replays_dir.mkdir(parents=True, exist_ok=True)
+                self._dir_ready = True
+        except OSError as e:
+            print(f"Warning: Failed to create {self.replays_dir}: {e}")
+            self.failed_ids.update(item["questionId"] for item in batch)
+            return
+
+        fsync_files = self.fsync_policy != "none"
+        saved = 0
+        for replay_data in batch:
+            question_id = replay_data["questionId"]
+            output_file = self.replays_dir / f"{question_id}.json"
+            try:
+                payload = encode_json(replay_data, self.json_style)
+                write_file_atomic(output_file, payload, fsync=fsync_files)
+                if self.fsync_policy == "always":
+                    fsync_directory(self.replays_dir)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Warning: Failed to save replay {question_id}: {e}")
+                self.failed_ids.add(question_id)
+                continue
+            self.written_ids.add(question_id)
+            self.bytes_written += len(payload)
+            saved += 1
+
+        if self.fsync_policy == "batch" and saved:
+            fsync_directory(self.replays_dir)
+
+        self.batches += 1
+        self.busy_seconds += time.monotonic() - started
+        print(f"  ✓ Saved {saved} replay(s) to {self.replays_dir}")
 
 
 def save_manifest(
         output_dir: Path,
         spec: dict[str, Any],
-        question_ids: list[str]
+        question_ids: list[str],
+        fsync: bool = False
 ) -> None:
     """Save a manifest file for the generated replays."""
     manifest_data = {
@@ -462,12 +1312,401 @@ def save_manifest(
     }
 
     manifest_file = output_dir / "manifest.json"
-    with open(manifest_file, "w", encoding="utf-8") as f:
-        json.dump(manifest_data, f, indent=2, ensure_ascii=False)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    write_file_atomic(manifest_file, encode_json(manifest_data, "pretty"), fsync=fsync)
 
     print(f"  ✓ Saved manifest: {manifest_file}")
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Generation Loop
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def generate_one(
+        spec: dict[str, Any],
+        question: QuestionRecord,
+        writer: ReplayWriter,
+        hedger: Hedger | None,
+        label: str
+) -> bool:
+    """Generate one replay and hand it to the writer; returns True on a valid answer."""
+    # Hold the full question text only while this replay is in flight
+    try:
+        question.acquire()
+    except (OSError, ValueError) as e:
+        print(f"  {label} ✗ Failed to read question: {e}")
+        return False
+
+    try:
+        if hedger:
+            reasoning, final_answer, usage_info = await hedger.call(spec, question)
+        else:
+            reasoning, final_answer, usage_info = await call_spec(spec, question)
+
+        if not final_answer:
+            print(f"  {label} ✗ Failed to get a valid answer")
+            return False
+
+        print(f"  {label} Answer: {json.dumps(final_answer)}")
+        # submit() may block on a full writer queue; keep the event loop free
+        await asyncio.to_thread(writer.submit, question, reasoning, final_answer, usage_info)
+        return True
+    finally:
+        question.release()
+
+
+async def generate_replays(
+        spec: dict[str, Any],
+        questions: list[QuestionRecord],
+        order: list[int],
+        processed_set: set[str],
+        writer: ReplayWriter,
+        hedger: Hedger | None,
+        concurrency: int = 1,
+        interactive: bool = False
+) -> None:
+    """
+    Dispatch questions (by index, in `order`) to the LLM with at most `concurrency`
+    requests in flight, handing valid answers to the writer and recording them in
+    processed_set.
+    """
+    total = len(questions)
+    pending = iter(order)
+
+    async def worker() -> None:
+        for idx in pending:
+            question = questions[idx]
+            question_id = question.question_id
+
+            # Skip already-generated replay files (useful for reruns)
+            if question_id in processed_set:
+                print(f"\n[{idx + 1}/{total}] Question: {question_id}")
+                print("  ↷ Skipping (replay already exists)")
+                continue
+
+            print(f"\n[{idx + 1}/{total}] Question: {question_id}")
+            try:
+                prompt = question.acquire().get("prompt", "")
+            except (OSError, ValueError) as e:
+                print(f"  ✗ Failed to read question: {e}")
+                continue
+
+            try:
+                prompt_preview = prompt[:80]
+                if len(prompt) > 80:
+                    prompt_preview += "..."
+                print(f"  Prompt: {prompt_preview}")
+
+                if interactive:
+                    await asyncio.to_thread(input, "  Press Enter to process this question...")
+
+                print("  Calling LLM API...")
+                if await generate_one(spec, question, writer, hedger, f"[{idx + 1}/{total}]"):
+                    processed_set.add(question_id)
+            finally:
+                question.release()
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        await close_async_clients()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Watch Mode
+# ─────────────────────────────────────────────────────────────────────────────
+
+def file_signature(path: Path) -> tuple[int, int] | None:
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def is_json_file(path: Path) -> bool:
+    """Whether a file can be read and parsed as JSON."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            json.load(f)
+    except (json.JSONDecodeError, OSError, UnicodeDecodeError):
+        return False
+    return True
+
+
+class QuestionSetCache:
+    """Questions of one question set, reloaded incrementally when its manifest changes."""
+
+    def __init__(self, question_set_path: str) -> None:
+        self.question_set_path = question_set_path
+        self.signature: tuple[int, int] | None = None
+        self.order: list[str] = []
+        self.questions: dict[str, QuestionRecord] = {}
+
+    def refresh(self) -> bool:
+        """Reload the manifest if it changed, parsing only newly listed question files."""
+        signature = file_signature(resolve_question_dir(self.question_set_path) / "manifest.json")
+        if signature == self.signature:
+            return False
+        self.signature = signature
+
+        question_ids = load_question_ids(self.question_set_path)
+        if question_ids is None:
+            return False  # keep serving the last good manifest
+
+        new_ids = [qid for qid in question_ids if qid not in self.questions]
+        for question in load_questions(self.question_set_path, new_ids):
+            self.questions[question.question_id] = question
+
+        listed = set(question_ids)
+        for question_id in [qid for qid in self.questions if qid not in listed]:
+            del self.questions[question_id]
+        self.order = [qid for qid in question_ids if qid in self.questions]
+        if new_ids:
+            print(f"Question set {self.question_set_path}: {len(new_ids)} new question(s)")
+        return True
+
+
+class WatchedSpec:
+    """Per-spec daemon state: output directory, writer and which pairs are done or queued."""
+
+    def __init__(self, spec: dict[str, Any], output_dir: Path, writer: ReplayWriter) -> None:
+        self.spec = spec
+        self.output_dir = output_dir
+        self.writer = writer
+        self.processed = collect_existing_replay_ids(output_dir)
+        self.queued: set[str] = set()
+        self.failed: set[str] = set()
+        self.needs_scan = True
+        self.dirty = False
+
+
+class ReplayDaemon:
+    """
+    Long-running generator that follows LLM-Configs/*.json and each spec's
+    question set manifest.
+
+    Every poll re-reads only the spec files and manifests whose (mtime, size)
+    changed, then queues the (spec, question) pairs that have no replay yet on
+    one worker pool shared by all specs. Manifests of specs that gained replays
+    are republished after each poll. Failed pairs are retried on the next poll.
+    """
+
+    def __init__(self, output_root: Path, args: argparse.Namespace) -> None:
+        self.output_root = output_root
+        self.args = args
+        self.spec_files: dict[Path, tuple[tuple[int, int] | None, str | None]] = {}
+        self.specs: dict[str, WatchedSpec] = {}
+        self.question_sets: dict[str, QuestionSetCache] = {}
+        self.hedgers: dict[str, Hedger] = {}
+        self.retired: list[WatchedSpec] = []
+
+    def _new_writer(self, output_dir: Path) -> ReplayWriter:
+        return ReplayWriter(
+            output_dir,
+            queue_size=self.args.writer_queue_size,
+            batch_size=self.args.writer_batch_size,
+            json_style=self.args.json_style,
+            fsync_policy=self.args.fsync
+        )
+
+    def poll_specs(self) -> None:
+        """
+        Load new or modified spec files and drop specs whose file disappeared or is
+        no longer a usable Premium spec. A file that does not parse (most likely
+        caught mid-write) keeps its current spec and is read again on the next poll.
+        """
+        seen: set[Path] = set()
+        for json_file in sorted(LLM_CONFIGS_DIR.glob("*.json")):
+            seen.add(json_file)
+            signature = file_signature(json_file)
+            previous = self.spec_files.get(json_file)
+            if previous is not None and previous[0] == signature:
+                continue
+
+            spec = load_premium_spec(json_file)
+            if spec is None and previous is not None and previous[1] and not is_json_file(json_file):
+                continue
+            spec_id = spec.get("id", "unknown") if spec else None
+            if previous is not None and previous[1] and previous[1] != spec_id:
+                self._drop_spec(previous[1])
+            self.spec_files[json_file] = (signature, spec_id)
+            if spec is not None:
+                self._upsert_spec(spec)
+
+        for json_file in [p for p in self.spec_files if p not in seen]:
+            _, spec_id = self.spec_files.pop(json_file)
+            if spec_id:
+                self._drop_spec(spec_id)
+
+    def _upsert_spec(self, spec: dict[str, Any]) -> None:
+        spec_id = spec.get("id", "unknown")
+        _routers[spec_id] = EndpointRouter.from_spec(
+            spec, failure_threshold=self.args.breaker_failures, cooldown=self.args.breaker_cooldown
+        )
+        if self.args.hedge and spec_id not in self.hedgers:
+            self.hedgers[spec_id] = Hedger(
+                pct=self.args.hedge_percentile,
+                min_samples=self.args.hedge_min_samples,
+                max_extra_cost=self.args.hedge_max_extra_cost
+            )
+
+        watched = self.specs.get(spec_id)
+        if watched is None:
+            output_dir = self.output_root / spec_id
+            watched = self.specs[spec_id] = WatchedSpec(spec, output_dir, self._new_writer(output_dir))
+            print(f"Watching spec {spec_id} ({len(watched.processed)} replay(s) on disk)")
+        else:
+            print(f"Reloaded spec {spec_id}")
+        watched.spec = spec
+        watched.needs_scan = True
+        self._update_hedge_fallback()
+
+        question_set_path = spec.get("questionSetPath", "")
+        if question_set_path not in self.question_sets:
+            self.question_sets[question_set_path] = QuestionSetCache(question_set_path)
+
+    def _drop_spec(self, spec_id: str) -> None:
+        watched = self.specs.pop(spec_id, None)
+        if watched is None:
+            return
+        print(f"Spec {spec_id} removed; no new replays will be queued for it")
+        # In-flight requests may still hand results to its writer; close it on shutdown
+        self.retired.append(watched)
+        self._update_hedge_fallback()
+
+    def _update_hedge_fallback(self) -> None:
+        """Point every hedger at the --hedge-fallback spec, or at its own spec while that is not loaded."""
+        if not self.args.hedge_fallback:
+            return
+        fallback = self.specs.get(self.args.hedge_fallback)
+        for hedger in self.hedgers.values():
+            hedger.fallback_spec = fallback.spec if fallback is not None else None
+
+    def poll_question_sets(self) -> None:
+        """Refresh manifests in use; rescan the specs whose question set changed."""
+        in_use = {w.spec.get("questionSetPath", "") for w in self.specs.values()}
+        for path in [p for p in self.question_sets if p not in in_use]:
+            del self.question_sets[path]
+        for path, cache in self.question_sets.items():
+            if cache.refresh():
+                for watched in self.specs.values():
+                    if watched.spec.get("questionSetPath", "") == path:
+                        watched.needs_scan = True
+
+    def enqueue_missing(self, work: "asyncio.Queue[tuple[str, str]]") -> None:
+        """Queue every (spec, question) pair without a replay that is not already queued."""
+        for spec_id, watched in self.specs.items():
+            retry = watched.failed
+            watched.failed = set()
+            if watched.needs_scan:
+                cache = self.question_sets[watched.spec.get("questionSetPath", "")]
+                candidates = cache.order
+                watched.needs_scan = False
+            else:
+                candidates = list(retry)
+            queued = 0
+            for question_id in candidates:
+                if question_id in watched.processed or question_id in watched.queued:
+                    continue
+                watched.queued.add(question_id)
+                work.put_nowait((spec_id, question_id))
+                queued += 1
+            if queued:
+                print(f"Queued {queued} new replay(s) for {spec_id}")
+
+    async def worker(self, work: "asyncio.Queue[tuple[str, str]]") -> None:
+        while True:
+            spec_id, question_id = await work.get()
+            try:
+                watched = self.specs.get(spec_id)
+                if watched is None:
+                    continue
+                watched.queued.discard(question_id)
+                cache = self.question_sets.get(watched.spec.get("questionSetPath", ""))
+                question = cache.questions.get(question_id) if cache else None
+                if question is None or question_id in watched.processed:
+                    continue
+
+                ok = await generate_one(
+                    watched.spec, question, watched.writer, self.hedgers.get(spec_id), f"[{spec_id}] {question_id}"
+                )
+                if ok:
+                    watched.processed.add(question_id)
+                    watched.dirty = True
+                else:
+                    watched.failed.add(question_id)
+            finally:
+                work.task_done()
+
+    def _publish(self, watched: WatchedSpec) -> None:
+        """Wait for the spec's writer, then rewrite its manifest in question set order."""
+        if not watched.dirty:
+            return
+        watched.dirty = False
+        watched.writer.flush()
+        watched.processed -= watched.writer.failed_ids
+        watched.failed |= watched.writer.failed_ids
+        watched.writer.failed_ids.clear()
+
+        cache = self.question_sets.get(watched.spec.get("questionSetPath", ""))
+        order = cache.order if cache else []
+        ordered_ids = [qid for qid in order if qid in watched.processed]
+        if ordered_ids:
+            save_manifest(watched.output_dir, watched.spec, ordered_ids, fsync=self.args.fsync != "none")
+
+    def publish_manifests(self) -> None:
+        for watched in list(self.specs.values()):
+            self._publish(watched)
+
+    async def run(self, concurrency: int, interval: float) -> None:
+        work: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
+        workers = [asyncio.create_task(self.worker(work)) for _ in range(max(1, concurrency))]
+        try:
+            while True:
+                await asyncio.to_thread(self.poll_specs)
+                await asyncio.to_thread(self.poll_question_sets)
+                self.enqueue_missing(work)
+                await asyncio.to_thread(self.publish_manifests)
+                await asyncio.sleep(interval)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await close_async_clients()
+
+    def close(self) -> None:
+        """Flush writers and publish final manifests."""
+        everything = list(self.specs.values()) + self.retired
+        for watched in everything:
+            watched.writer.close()
+        for watched in everything:
+            self._publish(watched)
+        for watched in everything:
+            print(f"Spec {watched.spec.get('id', 'unknown')}:")
+            watched.writer.print_stats()
+
+
+def run_watch(args: argparse.Namespace) -> None:
+    """Run the generator as a daemon until interrupted."""
+    if not LLM_CONFIGS_DIR.is_dir():
+        print(f"Error: LLM-Configs directory not found at {LLM_CONFIGS_DIR}")
+        sys.exit(1)
+
+    output_root = Path(args.output_dir) if args.output_dir else Path(__file__).parent / "replay_output"
+    print(f"Watch mode: polling {LLM_CONFIGS_DIR} every {args.watch_interval:g}s; "
+          f"writing to {output_root}/<spec id>/ (Ctrl+C to stop)")
+
+    daemon = ReplayDaemon(output_root, args)
+    try:
+        asyncio.run(daemon.run(max(1, args.concurrency), args.watch_interval))
+    except KeyboardInterrupt:
+        print("\nStopping watch mode...")
+    finally:
+        daemon.close()
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Main
 # ─────────────────────────────────────────────────────────────────────────────
@@ -516,20 +1755,146 @@ def main():
         type=str,
         help="Custom output directory"
     )
-    parser.add_argument(
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument(
         "--limit",
         type=int,
         help="Process only the first N questions"
     )
+    selection.add_argument(
+        "--sample",
+        type=int,
+        help="Process a stratified random sample of N questions (see --stratify-by, --seed)"
+    )
+    parser.add_argument(
+        "--stratify-by",
+        type=str,
+        default="category,difficulty",
+        help="Comma-separated question fields that define the sampling strata"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed for --sample (keep it fixed to resume the same subset)"
+    )
     parser.add_argument(
         "--resume",
         type=int,
         default=1,
         help="Resume from question index N (1-based). Use 0 to auto-resume from first missing replay."
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Max in-flight API requests (requires --auto when > 1)"
+    )
+    parser.add_argument(
+        "--manifest-order",
+        action="store_true",
+        help="Dispatch in manifest order instead of longest-expected-first (concurrency > 1)"
+    )
+    parser.add_argument(
+        "--history-dir",
+        action="append",
+        help="Replay output dir(s) whose replays predict output length "
+             "(default: sibling dirs of the output directory)"
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a duplicate request when one outlives the run's learned latency percentile"
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=95.0,
+        help="Latency percentile (of this run) after which a request is hedged"
+    )
+    parser.add_argument(
+        "--hedge-min-samples",
+        type=int,
+        default=20,
+        help="Successful requests to observe before hedging starts"
+    )
+    parser.add_argument(
+        "--hedge-max-extra-cost",
+        type=float,
+        default=0.05,
+        help="Cap on hedging as extra cost: hedged requests / primary requests (0.05 = +5%%)"
+    )
+    parser.add_argument(
+        "--hedge-fallback",
+        type=str,
+        help="Premium spec id to send hedges to (default: the selected spec)"
+    )
+    parser.add_argument(
+        "--breaker-failures",
+        type=int,
+        default=3,
+        help="Consecutive request errors that take an endpoint out of rotation"
+    )
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=30.0,
+        help="Seconds a tripped endpoint stays out of rotation before a probe request"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Run as a daemon: generate missing replays for every Premium spec as specs "
+             "and question sets change (--output-dir is then the root for <spec id>/)"
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between polls of LLM-Configs/ and question set manifests in --watch mode"
+    )
+    parser.add_argument(
+        "--json-style",
+        choices=JSON_STYLES,
+        default="pretty",
+        help="Replay file encoding: pretty (indent=2) or compact"
+    )
+    parser.add_argument(
+        "--fsync",
+        choices=FSYNC_POLICIES,
+        default="none",
+        help="fsync policy for replay files: none (default), batch (fsync every file, the "
+             "directory once per batch) or always (also the directory after every file)"
+    )
+    parser.add_argument(
+        "--writer-queue-size",
+        type=int,
+        default=64,
+        help="Max finished replays waiting for the writer before generation blocks"
+    )
+    parser.add_argument(
+        "--writer-batch-size",
+        type=int,
+        default=16,
+        help="Max replays the writer persists per batch"
+    )
 
     args = parser.parse_args()
 
+    if args.watch:
+        # The daemon covers every question of every spec, always skipping existing replays
+        ignored = [
+            flag for flag, used in (
+                ("--limit", args.limit is not None),
+                ("--sample", args.sample is not None),
+                ("--resume", args.resume != 1),
+            ) if used
+        ]
+        if ignored:
+            parser.error(f"{', '.join(ignored)} cannot be used with --watch")
+        run_watch(args)
+        return
+
     # Load Premium specs
     print("\nLoading Premium specs...")
     specs = load_premium_specs()
@@ -560,7 +1925,11 @@ def main():
     # Load questions
     question_set_path = spec.get("questionSetPath", "")
     print(f"\nLoading questions from: {question_set_path}")
-    questions = load_questions(question_set_path)
+    question_ids = load_question_ids(question_set_path)
+    if question_ids and args.sample and args.sample > 0:
+        fields = [f.strip() for f in args.stratify_by.split(",") if f.strip()]
+        question_ids = stratified_sample(question_set_path, question_ids, args.sample, fields, args.seed)
+    questions = load_questions(question_set_path, question_ids) if question_ids is not None else []
 
     if not questions:
         print("No questions found.")
@@ -588,6 +1957,36 @@ def main():
     elif args.resume > 1:
         print(f"Resuming from question #{start_index + 1}.")
 
+    if args.concurrency > 1 and not args.auto:
+        print("Note: --concurrency needs --auto; processing one question at a time.")
+
+    # Dispatch order: longest expected output first keeps stragglers off the tail
+    order = list(range(start_index, len(questions)))
+    concurrency = args.concurrency if args.auto else 1
+    if concurrency > 1 and not args.manifest_order:
+        order = [idx for idx in order if questions[idx].question_id not in existing_ids]
+        history_dirs = [Path(d) for d in args.history_dir] if args.history_dir else [output_dir.parent]
+        predicted = predict_output_lengths([questions[idx] for idx in order], history_dirs, output_dir)
+        order = schedule_longest_first(order, questions, predicted)
+        print(f"Scheduling {len(order)} question(s) longest-expected-first")
+
+    # Optional hedging of slow requests
+    hedger: Hedger | None = None
+    if args.hedge:
+        fallback_spec = None
+        if args.hedge_fallback:
+            fallback_spec = next((sp for sp in specs if sp.get("id") == args.hedge_fallback), None)
+            if fallback_spec is None:
+                parser.error(f"--hedge-fallback: no Premium spec with id '{args.hedge_fallback}'")
+        hedger = Hedger(
+            pct=args.hedge_percentile,
+            min_samples=args.hedge_min_samples,
+            max_extra_cost=args.hedge_max_extra_cost,
+            fallback_spec=fallback_spec
+        )
+
+    init_routers(specs, args.breaker_failures, args.breaker_cooldown)
+
     # Process each question
     print("\n" + "=" * 60)
     print("Processing Questions")
@@ -596,48 +1995,47 @@ def main():
     # Track processed IDs (existing + new), but write manifest in question order
     processed_set: set[str] = set(existing_ids)
 
-    for idx in range(start_index, len(questions)):
-        question = questions[idx]
-        question_id = question.get("questionId", "unknown")
-
-        # Skip already-generated replay files (useful for reruns)
-        if question_id in processed_set:
-            print(f"\n[{idx + 1}/{len(questions)}] Question: {question_id}")
-            print("  ↷ Skipping (replay already exists)")
-            continue
-
-        prompt_preview = question.get("prompt", "")[:80]
-        if len(question.get("prompt", "")) > 80:
-            prompt_preview += "..."
-
-        print(f"\n[{idx + 1}/{len(questions)}] Question: {question_id}")
-        print(f"  Prompt: {prompt_preview}")
-
-        if not args.auto:
-            input("  Press Enter to process this question...")
-
-        print("  Calling LLM API...")
-        reasoning, final_answer, usage_info = call_llm_api(spec, question)
+    # Persistence runs on a background writer so disk I/O never stalls API dispatch
+    writer = ReplayWriter(
+        output_dir,
+        queue_size=args.writer_queue_size,
+        batch_size=args.writer_batch_size,
+        json_style=args.json_style,
+        fsync_policy=args.fsync
+    )
 
-        if final_answer:
-            print(f"  Answer: {json.dumps(final_answer)}")
-            save_replay(output_dir, question, reasoning, final_answer, usage_info)
-            processed_set.add(question_id)
-        else:
-            print("  ✗ Failed to get a valid answer")
+    try:
+        asyncio.run(generate_replays(
+            spec, questions, order, processed_set, writer, hedger,
+            concurrency=concurrency,
+            interactive=not args.auto
+        ))
+    except KeyboardInterrupt:
+        print("\nInterrupted; flushing replays generated so far.")
+    finally:
+        # Wait for queued replays to hit disk before the manifest references them
+        writer.close()
+
+    processed_set -= writer.failed_ids
 
     # Save manifest (in the original question order)
     ordered_processed_ids = [
-        q.get("questionId", "unknown")
+        q.question_id
         for q in questions
-        if q.get("questionId", "unknown") in processed_set
+        if q.question_id in processed_set
     ]
 
     if ordered_processed_ids:
         print("\n" + "-" * 60)
-        save_manifest(output_dir, spec, ordered_processed_ids)
+        save_manifest(output_dir, spec, ordered_processed_ids, fsync=args.fsync != "none")
 
     print("\n" + "=" * 60)
+    writer.print_stats()
+    if hedger:
+        hedger.print_stats()
+    get_router(spec).print_stats(spec_id)
+    if hedger and hedger.fallback_spec:
+        get_router(hedger.fallback_spec).print_stats(hedger.fallback_spec.get("id", "unknown"))
     print(f"Done! Processed {len(ordered_processed_ids)}/{len(questions)} questions")
     print("=" * 60)
 
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Replay Pacing Simulator for LMVersus-U
+
+Predicts how a Lightweight replay dataset plays out in the browser without
+running the server. It mirrors LocalAnswerDao (reasoning split into 5-char
+chunks, one token each) and LlmStreamOrchestrator (revealDelayMs, burst pacing
+at targetTokensPerSecond * burstMultiplierOnFinal, maxBufferedChars truncation
+and the chunkDelay tail withheld until round end).
+
+A local replay is fully buffered before pacing starts, so each question's
+timeline has a closed form in its reasoning length. The simulator reads the
+dataset once into columns and evaluates every streaming config over whole
+columns, so sweeping settings over thousands of replays takes seconds.
+
+Usage:
+    python replay_pacing_simulator.py --spec <lightweight spec.json> [--sweep key=v1,v2 ...] [--csv <path>]
+    python replay_pacing_simulator.py --dataset <dir> --streaming '<json>' [--sweep ...] [--csv <path>]
+
+Options:
+    --spec          Lightweight spec; uses its datasetPath and streaming block
+    --dataset       Replay dataset directory (manifest.json + replays/)
+    --streaming     Streaming block as JSON (overrides the spec's values key by key)
+    --sweep         Try several values of one streaming key, e.g. targetTokensPerSecond=20,37,60
+                    (repeatable; all combinations are simulated)
+    --csv           Write the per-question timeline of every config to a CSV file
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Any
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Configuration (matching LocalAnswerDao and StreamingPolicy)
+# ─────────────────────────────────────────────────────────────────────────────
+
+BASE_DIR = Path(__file__).parent
+REASONING_CHUNK_CHAR_LIMIT = 5
+
+STREAMING_DEFAULTS: dict[str, Any] = {
+    "revealDelayMs": 0,
+    "targetTokensPerSecond": 0,
+    "burstMultiplierOnFinal": 1.0,
+    "maxBufferedChars": 200_000,
+    "chunkDelay": 0,
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Dataset Loading
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ReplayColumns:
+    """Column store of the replay fields the pacing depends on."""
+
+    __slots__ = ("question_ids", "reasoning_chars")
+
+    def __init__(self) -> None:
+        self.question_ids: list[str] = []
+        self.reasoning_chars: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+
+def load_dataset(dataset_dir: Path) -> ReplayColumns:
+    """Load a replay dataset's reasoning lengths in manifest order."""
+    columns = ReplayColumns()
+    manifest_path = dataset_dir / "manifest.json"
+    replays_dir = dataset_dir / "replays"
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        question_ids = [str(qid) for qid in manifest.get("availableQuestionIds", [])]
+    except (json.JSONDecodeError, OSError, AttributeError) as e:
+        print(f"Warning: Failed to load manifest {manifest_path} ({e}); using replays/*.json")
+        question_ids = sorted(p.stem for p in replays_dir.glob("*.json"))
+
+    for question_id in question_ids:
+        replay_file = replays_dir / f"{question_id}.json"
+        try:
+            with open(replay_file, "r", encoding="utf-8") as f:
+                replay = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: Failed to load replay {replay_file}: {e}")
+            continue
+        columns.question_ids.append(question_id)
+        columns.reasoning_chars.append(len(replay.get("llmReasoning") or ""))
+
+    return columns
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Simulation (matching LlmStreamOrchestrator.applyWithReveal)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def burst_delay_ms(policy: dict[str, Any]) -> int:
+    """Delay after each one-token delta once burst mode is on (delayFor(delta, burst = true))."""
+    tps = policy["targetTokensPerSecond"]
+    if tps <= 0:
+        return 0
+    base_ms = 1000.0 / tps
+    multiplier = policy["burstMultiplierOnFinal"]
+    ms = base_ms / multiplier if multiplier > 0 else base_ms
+    return math.ceil(ms) if ms > 0 else 0
+
+
+def simulate(columns: ReplayColumns, policy: dict[str, Any]) -> dict[str, list[int]]:
+    """
+    Simulate every replay under one streaming policy.
+
+    Returns columns (all times in ms from round start):
+        - chunks:          reasoning chunks produced by LocalAnswerDao
+        - truncated_chars: oldest characters dropped by maxBufferedChars
+        - released_chunks: chunks shown while the round runs
+        - withheld_chars:  tail held back by chunkDelay and revealed at round end
+        - first_reveal_ms: first reasoning delta (-1 if nothing is shown)
+        - final_ms:        ReasoningEnded / FinalAnswer, i.e. when the LLM is done
+    """
+    reveal = max(0, int(policy["revealDelayMs"]))
+    max_chars = int(policy["maxBufferedChars"])
+    hold_back = max(0, int(policy["chunkDelay"]))
+    delay = burst_delay_ms(policy)
+    size = REASONING_CHUNK_CHAR_LIMIT
+
+    chunks_col = [-(-n // size) for n in columns.reasoning_chars]
+    dropped_col = [
+        min(max(0, -(-(n - max_chars) // size)), max(0, c - 1))
+        for n, c in zip(columns.reasoning_chars, chunks_col)
+    ]
+    kept_col = [c - d for c, d in zip(chunks_col, dropped_col)]
+    kept_chars_col = [n - d * size for n, d in zip(columns.reasoning_chars, dropped_col)]
+    released_col = [k - hold_back if k > hold_back else 0 for k in kept_col]
+    # The withheld tail is whole 5-char chunks except the (possibly short) last one
+    withheld_col = [
+        max(0, kc - r * size) if r else kc
+        for kc, r in zip(kept_chars_col, released_col)
+    ]
+    # With no hold-back the terminal follows the last delta without a final delay
+    tail_delays = 0 if hold_back == 0 else 1
+    final_col = [
+        reveal + (r - 1 + tail_delays) * delay if r else reveal
+        for r in released_col
+    ]
+
+    return {
+        "chunks": chunks_col,
+        "truncated_chars": [d * size for d in dropped_col],
+        "released_chunks": released_col,
+        "withheld_chars": withheld_col,
+        "first_reveal_ms": [reveal if r else -1 for r in released_col],
+        "final_ms": final_col,
+    }
+
+
+def quantile(sorted_values: list[int], q: float) -> float:
+    """Linear-interpolated quantile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    pos = q * (len(sorted_values) - 1)
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(result: dict[str, list[int]]) -> dict[str, float]:
+    """Round-duration percentiles plus truncation and withheld counts for one config."""
+    final_ms = sorted(result["final_ms"])
+    count = len(final_ms)
+    return {
+        "questions": count,
+        "mean_s": (sum(final_ms) / count / 1000.0) if count else 0.0,
+        "p50_s": quantile(final_ms, 0.50) / 1000.0,
+        "p90_s": quantile(final_ms, 0.90) / 1000.0,
+        "max_s": (final_ms[-1] / 1000.0) if count else 0.0,
+        "truncated": sum(1 for t in result["truncated_chars"] if t > 0),
+        "withheld_chars": sum(result["withheld_chars"]),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Main
+# ─────────────────────────────────────────────────────────────────────────────
+
+def parse_sweep(raw: str) -> tuple[str, list[float]]:
+    """Parse key=v1,v2,... into (key, values)."""
+    key, sep, values = raw.partition("=")
+    key = key.strip()
+    if not sep or key not in STREAMING_DEFAULTS:
+        raise ValueError(f"--sweep expects <key>=<v1>,<v2>,... with key in {sorted(STREAMING_DEFAULTS)}")
+    return key, [float(v) for v in values.split(",") if v.strip()]
+
+
+def policy_label(policy: dict[str, Any], swept: list[str]) -> str:
+    keys = swept or ["targetTokensPerSecond", "burstMultiplierOnFinal", "chunkDelay"]
+    return " ".join(f"{k}={policy[k]:g}" for k in keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulate Lightweight replay pacing for a dataset and streaming settings"
+    )
+    parser.add_argument(
+        "--spec",
+        type=str,
+        help="Lightweight spec JSON (provides datasetPath and streaming)"
+    )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        help="Replay dataset directory (overrides the spec's datasetPath)"
+    )
+    parser.add_argument(
+        "--streaming",
+        type=str,
+        help="Streaming block as JSON (overrides the spec's streaming values)"
+    )
+    parser.add_argument(
+        "--sweep",
+        action="append",
+        default=[],
+        help="Streaming key and values to sweep, e.g. targetTokensPerSecond=20,37,60"
+    )
+    parser.add_argument(
+        "--csv",
+        type=str,
+        help="Write per-question timelines to this CSV file"
+    )
+
+    args = parser.parse_args()
+
+    streaming: dict[str, Any] = dict(STREAMING_DEFAULTS)
+    dataset_path = args.dataset
+    if args.spec:
+        try:
+            with open(args.spec, "r", encoding="utf-8") as f:
+                spec = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Error: Failed to load spec {args.spec}: {e}")
+            sys.exit(1)
+        streaming.update(spec.get("streaming") or {})
+        dataset_path = dataset_path or spec.get("datasetPath")
+    if args.streaming:
+        try:
+            streaming.update(json.loads(args.streaming))
+        except json.JSONDecodeError as e:
+            parser.error(f"--streaming is not valid JSON: {e}")
+
+    if not dataset_path:
+        parser.error("either --spec with a datasetPath or --dataset is required")
+
+    try:
+        sweeps = [parse_sweep(raw) for raw in args.sweep]
+    except ValueError as e:
+        parser.error(str(e))
+        return
+
+    # Resolve relative paths from repo root (like questionSetPath in replay_generator.py)
+    dataset_dir = Path(dataset_path)
+    if not dataset_dir.is_absolute() and not dataset_dir.is_dir():
+        dataset_dir = BASE_DIR / dataset_path
+
+    print(f"Loading replays from: {dataset_dir}")
+    columns = load_dataset(dataset_dir)
+    if not columns:
+        print("No replays found.")
+        sys.exit(1)
+    print(f"Loaded {len(columns)} replay(s)")
+
+    swept_keys = [key for key, _ in sweeps]
+    policies = []
+    for combo in itertools.product(*(values for _, values in sweeps)):
+        policy = dict(streaming)
+        policy.update(zip(swept_keys, combo))
+        policies.append(policy)
+
+    csv_writer = None
+    csv_file = None
+    if args.csv:
+        csv_file = open(args.csv, "w", encoding="utf-8", newline="")
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow([
+            "config", "questionId", "reasoningChars", "chunks", "truncatedChars",
+            "releasedChunks", "withheldChars", "firstRevealMs", "finalMs"
+        ])
+
+    print("\n" + "=" * 60)
+    print("Simulated round durations (time until the LLM's final answer)")
+    print("=" * 60)
+    try:
+        for policy in policies:
+            result = simulate(columns, policy)
+            stats = summarize(result)
+            label = policy_label(policy, swept_keys)
+            print(
+                f"{label}: mean {stats['mean_s']:.1f}s, p50 {stats['p50_s']:.1f}s, "
+                f"p90 {stats['p90_s']:.1f}s, max {stats['max_s']:.1f}s; "
+                f"{stats['truncated']} truncated, {stats['withheld_chars']} chars withheld"
+            )
+            if csv_writer:
+                for i, question_id in enumerate(columns.question_ids):
+                    csv_writer.writerow([
+                        label, question_id, columns.reasoning_chars[i], result["chunks"][i],
+                        result["truncated_chars"][i], result["released_chunks"][i],
+                        result["withheld_chars"][i], result["first_reveal_ms"][i], result["final_ms"][i]
+                    ])
+    finally:
+        if csv_file:
+            csv_file.close()
+            print(f"\n  ✓ Saved timelines: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()